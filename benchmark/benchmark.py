@@ -0,0 +1,148 @@
+"""
+Benchmark sin conexión contra el simulador local de WhatsApp Web
+Ejecuta buscar_comunidad, agregar_participante y eliminar_participante del
+gestor real contra benchmark/mock_whatsapp y reporta operaciones por minuto.
+
+Uso:
+    python benchmark/benchmark.py --operaciones 20 --latencia-ms 150 --prob-fallo 0.05
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import argparse
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(DIRECTORIO))
+sys.path.insert(0, DIRECTORIO)
+
+from servidor_mock import ServidorMock, crear_configuracion
+from whatsapp_comunidades import GestorComunidadesWhatsApp, MetricasPasos
+
+
+def medir(resultados, operacion, funcion, *args):
+    """Ejecutar una operación del gestor y anotar (segundos, éxito)"""
+    inicio = time.perf_counter()
+    try:
+        exito = bool(funcion(*args))
+    except Exception as e:
+        print(f"❌ {operacion} lanzó una excepción: {e}")
+        exito = False
+    resultados.setdefault(operacion, []).append((time.perf_counter() - inicio, exito))
+    return exito
+
+
+def resumir(resultados, segundos_totales):
+    """Resumen por operación: cantidad, éxitos, p50/p95 y operaciones por minuto"""
+    resumen = {}
+    for operacion, muestras in resultados.items():
+        duraciones = [segundos for segundos, _ in muestras]
+        exitos = sum(1 for _, exito in muestras if exito)
+        resumen[operacion] = {
+            'cantidad': len(muestras),
+            'exitos': exitos,
+            'p50': round(MetricasPasos.percentil(duraciones, 50), 3),
+            'p95': round(MetricasPasos.percentil(duraciones, 95), 3),
+            'ops_por_minuto': round(exitos / sum(duraciones) * 60, 2) if sum(duraciones) else 0.0,
+        }
+
+    exitos = sum(datos['exitos'] for datos in resumen.values())
+    resumen['total'] = {
+        'segundos': round(segundos_totales, 2),
+        'exitos': exitos,
+        'ops_por_minuto': round(exitos / segundos_totales * 60, 2) if segundos_totales else 0.0,
+    }
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del gestor contra el simulador local de WhatsApp Web")
+    parser.add_argument("--operaciones", type=int, default=10, help="Ciclos buscar + agregar + eliminar")
+    parser.add_argument("--comunidades", type=int, default=3)
+    parser.add_argument("--miembros", type=int, default=20, help="Miembros iniciales por comunidad")
+    parser.add_argument("--latencia-ms", type=int, default=150, help="Latencia base de cada transición")
+    parser.add_argument("--variacion-ms", type=int, default=100, help="Variación aleatoria de la latencia")
+    parser.add_argument("--latencia-http-ms", type=int, default=0, help="Demora de cada respuesta HTTP")
+    parser.add_argument("--prob-fallo", type=float, default=0.0, help="Probabilidad de fallo al añadir un número")
+    parser.add_argument("--con-pausas", action="store_true",
+                        help="Mantener las pausas anti-detección del gestor (por defecto se desactivan)")
+    parser.add_argument("--ventana", action="store_true", help="Mostrar Chrome (por defecto headless)")
+    parser.add_argument("--liviano", action="store_true",
+                        help="Modo liviano del gestor: sin imágenes, medios, GPU ni animaciones")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--salida", help="Guardar el resumen en este archivo JSON")
+    args = parser.parse_args()
+
+    salida = os.path.abspath(args.salida) if args.salida else None
+    configuracion = crear_configuracion(
+        comunidades=args.comunidades, miembros=args.miembros, latencia_ms=args.latencia_ms,
+        variacion_ms=args.variacion_ms, prob_fallo=args.prob_fallo, latencia_carga_ms=500,
+        semilla=args.semilla,
+    )
+    servidor = ServidorMock(configuracion, latencia_http_ms=args.latencia_http_ms).iniciar()
+    print(f"🧪 Simulador en {servidor.url}")
+
+    # El gestor guarda sesión, índices y estadísticas en el directorio actual;
+    # el chromedriver ya resuelto del repositorio se reusa para no ir a la red
+    ruta_chromedriver = os.path.join(os.path.dirname(DIRECTORIO), "chromedriver.json")
+    os.chdir(tempfile.mkdtemp(prefix="benchmark_whatsapp_"))
+    gestor = GestorComunidadesWhatsApp()
+    gestor.ruta_chromedriver = ruta_chromedriver
+    gestor.url_whatsapp = servidor.url
+    gestor.usar_cache = True
+    gestor.headless = not args.ventana
+    gestor.modo_liviano = args.liviano
+    if not args.con_pausas:
+        gestor.pausa_min_paso = gestor.pausa_max_paso = 0
+        gestor.tiempo_min_contacto = gestor.tiempo_max_contacto = 0
+
+    aleatorio = random.Random(args.semilla)
+    comunidades = list(configuracion['comunidades'])
+    resultados = {}
+    try:
+        if not (gestor.configurar_navegador() and gestor.iniciar_whatsapp()):
+            print("❌ No se pudo abrir el simulador en Chrome")
+            return 1
+
+        inicio = time.perf_counter()
+        for n in range(args.operaciones):
+            comunidad = comunidades[n % len(comunidades)]
+            numero = f"3{aleatorio.randrange(10**9):09d}"
+            print(f"\n🔁 Ciclo {n + 1}/{args.operaciones}: {comunidad} / {numero}")
+
+            if medir(resultados, 'buscar_comunidad', gestor.buscar_comunidad, comunidad):
+                if medir(resultados, 'agregar_participante', gestor.agregar_participante, numero):
+                    if gestor._volver_a_detalles_comunidad(comunidad):
+                        medir(resultados, 'eliminar_participante', gestor.eliminar_participante, numero)
+            gestor._cerrar_ventanas_modales()
+        resumen = resumir(resultados, time.perf_counter() - inicio)
+    finally:
+        if gestor.driver:
+            gestor.driver.quit()
+        servidor.detener()
+
+    print("\n" + "="*60)
+    print("📊 RESULTADOS DEL BENCHMARK")
+    print("="*60)
+    print(f"   {'operación':<24} {'n':>4} {'ok':>4} {'p50':>7} {'p95':>7} {'ops/min':>8}")
+    for operacion, datos in resumen.items():
+        if operacion != 'total':
+            print(f"   {operacion:<24} {datos['cantidad']:>4} {datos['exitos']:>4} "
+                  f"{datos['p50']:>7.2f} {datos['p95']:>7.2f} {datos['ops_por_minuto']:>8.1f}")
+    total = resumen['total']
+    print(f"📈 {total['exitos']} operaciones exitosas en {total['segundos']} s: {total['ops_por_minuto']} ops/min")
+    gestor.mostrar_metricas()
+
+    if salida:
+        with open(salida, 'w', encoding='utf-8') as f:
+            json.dump({'parametros': vars(args), 'resumen': resumen, 'pasos': gestor.metricas.resumen()},
+                      f, ensure_ascii=False, indent=2)
+        print(f"📁 Resumen guardado en {salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+// Simulador local de WhatsApp Web.
+//
+// La configuración (/config.json) la genera servidor_mock.py: comunidades con
+// sus miembros, números que "no están en WhatsApp", latencia de cada
+// transición y probabilidad de fallo al añadir. Los miembros se guardan en
+// localStorage para sobrevivir a recargas (por ejemplo /send?phone=...).
+(async function () {
+    'use strict';
+
+    const config = await (await fetch('/config.json')).json();
+
+    const CLAVE_ESTADO = 'simulador_whatsapp';
+    let estado = JSON.parse(localStorage.getItem(CLAVE_ESTADO) || 'null');
+    if (!estado || estado.version !== config.version) {
+        estado = {version: config.version, comunidades: config.comunidades};
+    }
+    const guardar = () => localStorage.setItem(CLAVE_ESTADO, JSON.stringify(estado));
+
+    const digitos = texto => (texto || '').replace(/\D/g, '');
+    const demora = () => config.latencia_ms + Math.random() * config.variacion_ms;
+    const despues = funcion => setTimeout(funcion, demora());
+    const falla = () => Math.random() < config.prob_fallo;
+    const enWhatsApp = numero => digitos(numero).length >= 8 && !config.sin_whatsapp.includes(digitos(numero));
+
+    function crear(etiqueta, atributos, ...hijos) {
+        const nodo = document.createElement(etiqueta);
+        for (const [nombre, valor] of Object.entries(atributos || {})) {
+            if (nombre.startsWith('on')) nodo.addEventListener(nombre.slice(2), valor);
+            else nodo.setAttribute(nombre, valor);
+        }
+        for (const hijo of hijos) nodo.append(hijo);
+        return nodo;
+    }
+
+    // Capas abiertas (chat, panel de info, vistas y diálogos); ESC cierra la última
+    const capas = [];
+
+    function abrirCapa(nodo, contenedor, nivel) {
+        cerrarHasta(nivel);
+        contenedor.append(nodo);
+        capas.push({nodo: nodo, nivel: nivel});
+        return nodo;
+    }
+
+    function cerrarHasta(nivel) {
+        while (capas.length && capas[capas.length - 1].nivel >= nivel) capas.pop().nodo.remove();
+    }
+
+    function cerrarCapa(nodo) {
+        const indice = capas.findIndex(capa => capa.nodo === nodo);
+        if (indice >= 0) cerrarHasta(capas[indice].nivel);
+    }
+
+    document.addEventListener('keydown', evento => {
+        if (evento.key === 'Escape' && capas.length) {
+            cerrarCapa(capas[capas.length - 1].nodo);
+        }
+    }, true);
+
+    const NIVEL = {chat: 1, info: 2, vista: 3, dialogo: 4, menu: 5, confirmacion: 6};
+
+    function modal(nivel, ...hijos) {
+        const dialogo = crear('div', {role: 'dialog'}, ...hijos);
+        const fondo = crear('div', {class: 'fondo'}, dialogo);
+        abrirCapa(fondo, document.body, nivel);
+        return {fondo: fondo, dialogo: dialogo};
+    }
+
+    // Lista de chats y buscador
+    const lado = document.getElementById('lado');
+    const principal = document.getElementById('principal');
+    const info = document.getElementById('info');
+
+    function pintarChats(filtro) {
+        const panel = document.getElementById('pane-side');
+        panel.replaceChildren();
+        const nombres = Object.keys(estado.comunidades).filter(nombre => nombre.includes(filtro));
+        if (filtro && !nombres.length) {
+            panel.append(crear('span', {}, 'No se encontró ningún chat, contacto ni mensaje'));
+            return;
+        }
+        for (const nombre of nombres) {
+            panel.append(crear('div', {role: 'listitem', onclick: () => despues(() => abrirChat(nombre))},
+                               crear('span', {title: nombre, dir: 'auto'}, nombre)));
+        }
+    }
+
+    function abrirChat(nombre) {
+        const chat = crear('div', {class: 'capa-panel'},
+            crear('header', {'data-testid': 'conversation-header',
+                             onclick: () => despues(() => abrirInfo(nombre))},
+                crear('div', {role: 'button', title: 'Detalles del perfil',
+                              onclick: evento => { evento.stopPropagation(); despues(() => abrirInfo(nombre)); }},
+                    crear('span', {title: nombre}, nombre))),
+            crear('div', {'data-testid': 'conversation-panel-body', class: 'copyable-area'}, 'Mensajes'));
+        abrirCapa(chat, principal, NIVEL.chat);
+    }
+
+    function abrirInfo(nombre) {
+        const miembros = estado.comunidades[nombre] || [];
+        const panel = crear('div', {class: 'capa-panel'},
+            crear('div', {role: 'button', 'data-tab': '6', onclick: () => despues(() => abrirVista(nombre))}, nombre),
+            crear('button', {role: 'tab', title: 'Comunidad', onclick: () => despues(() => abrirVista(nombre))},
+                  'Comunidad'),
+            crear('div', {}, `${miembros.length} miembros`));
+        abrirCapa(panel, info, NIVEL.info);
+    }
+
+    // Vista de la comunidad: "Añadir miembros" y "X miembros de la comunidad"
+    function abrirVista(nombre) {
+        const vista = crear('div', {class: 'capa-panel'},
+            crear('button', {'aria-label': 'Añadir miembros', onclick: () => despues(() => dialogoAnadir(nombre))},
+                  'Añadir miembros'),
+            crear('div', {role: 'button', class: 'x1ypdohk', onclick: () => despues(() => dialogoMiembros(nombre))},
+                crear('span', {'data-icon': 'search'}, '🔍'),
+                crear('span', {}, `${estado.comunidades[nombre].length} miembros de la comunidad`)));
+        abrirCapa(vista, info, NIVEL.vista);
+    }
+
+    function dialogoAnadir(nombre) {
+        const seleccionados = [];
+        const campo = crear('div', {contenteditable: 'true', 'data-tab': '3',
+                                    'aria-label': 'Buscar un nombre o número'});
+        const resultados = crear('div', {class: 'lista'});
+        const chips = crear('div', {});
+        const pie = crear('div', {});
+        const {dialogo} = modal(NIVEL.dialogo, crear('div', {}, 'Añadir miembros'), chips, campo, resultados, pie);
+
+        function pintar() {
+            const numero = digitos(campo.textContent);
+            resultados.replaceChildren();
+            if (numero) {
+                if (enWhatsApp(numero)) {
+                    resultados.append(crear('div', {role: 'listitem'}, crear('span', {title: '+' + numero}, '+' + numero)));
+                } else {
+                    resultados.append(crear('span', {}, 'No se encontró ningún contacto'));
+                }
+            }
+            chips.replaceChildren(...seleccionados.map(n => crear('span', {class: 'chip'}, '+' + n)));
+            pie.replaceChildren();
+            if (seleccionados.length) {
+                pie.append(crear('div', {role: 'button', onclick: () => despues(confirmar)},
+                                 crear('span', {'data-icon': 'checkmark-medium'}, '✔')));
+            }
+        }
+
+        function confirmar() {
+            const texto = seleccionados.length > 1 ? 'Añadir miembros' : 'Añadir miembro';
+            const confirmacion = modal(NIVEL.confirmacion,
+                crear('div', {}, `¿Añadir a ${seleccionados.length} a "${nombre}"?`),
+                crear('div', {role: 'button', class: 'x1i10hfl x1qjc9v5', onclick: () => despues(aplicar)},
+                      crear('span', {}, texto)));
+
+            function aplicar() {
+                const fallidos = [];
+                for (const numero of seleccionados) {
+                    if (falla()) fallidos.push(numero);
+                    else if (!estado.comunidades[nombre].includes(numero)) estado.comunidades[nombre].push(numero);
+                }
+                guardar();
+                cerrarCapa(confirmacion.fondo);
+                if (fallidos.length) {
+                    dialogo.append(crear('span', {class: 'error'},
+                                         `No se pudo añadir a ${fallidos.map(n => '+' + n).join(', ')}`));
+                } else {
+                    cerrarHasta(NIVEL.dialogo);
+                }
+            }
+        }
+
+        campo.addEventListener('input', pintar);
+        campo.addEventListener('keydown', evento => {
+            if (evento.key !== 'Enter') return;
+            evento.preventDefault();
+            const numero = digitos(campo.textContent);
+            if (numero && enWhatsApp(numero) && !seleccionados.includes(numero)) {
+                seleccionados.push(numero);
+                campo.textContent = '';
+            }
+            pintar();
+        });
+        pintar();
+    }
+
+    function dialogoMiembros(nombre) {
+        const campo = crear('div', {contenteditable: 'true', 'aria-label': 'Buscar miembros'},
+                            crear('p', {class: 'selectable-text'}));
+        const lista = crear('div', {class: 'lista'});
+        const {dialogo} = modal(NIVEL.dialogo, crear('div', {}, 'Miembros'), campo, lista);
+
+        // Después de eliminar la lista queda vacía sin el aviso de "no encontrado"
+        function pintar(avisar = true) {
+            const filtro = digitos(campo.textContent);
+            const miembros = estado.comunidades[nombre].filter(numero => numero.includes(filtro));
+            lista.replaceChildren();
+            if (!filtro) lista.append(crear('div', {role: 'listitem'}, crear('span', {title: 'Tú'}, 'Tú')));
+            if (filtro && !miembros.length && avisar) {
+                lista.append(crear('span', {}, 'No se encontró ningún miembro'));
+            }
+            for (const numero of miembros) {
+                lista.append(crear('div', {role: 'listitem', class: '_ak8l _ap1_',
+                                           onclick: () => despues(() => menu(numero))},
+                                   crear('span', {title: '+' + numero}, '+' + numero)));
+            }
+        }
+
+        function menu(numero) {
+            const opciones = crear('div', {class: 'menu'},
+                crear('div', {class: 'x1c4vz4f', onclick: () => despues(() => confirmar(numero))},
+                    crear('span', {class: 'x1o2sk6j'}, 'Eliminar de la comunidad')));
+            abrirCapa(opciones, dialogo, NIVEL.menu);
+        }
+
+        function confirmar(numero) {
+            const confirmacion = modal(NIVEL.confirmacion,
+                crear('div', {}, `¿Eliminar a +${numero} de "${nombre}"?`),
+                crear('div', {role: 'button', onclick: () => cerrarHasta(NIVEL.menu)}, crear('span', {}, 'Cancelar')),
+                crear('div', {role: 'button', onclick: () => despues(() => {
+                    estado.comunidades[nombre] = estado.comunidades[nombre].filter(n => n !== numero);
+                    guardar();
+                    cerrarHasta(NIVEL.menu);
+                    pintar(false);
+                })}, crear('span', {class: 'x140p0ai'}, 'Eliminar')));
+        }
+
+        campo.addEventListener('input', () => pintar());
+        pintar();
+    }
+
+    // /send?phone=...: abrir el chat del número o avisar que no es válido
+    function abrirEnlace() {
+        const numero = digitos(new URLSearchParams(location.search).get('phone'));
+        if (enWhatsApp(numero)) {
+            abrirChat('+' + numero);
+        } else {
+            modal(NIVEL.dialogo, crear('div', {},
+                'El número de teléfono compartido a través de la dirección URL no es válido.'));
+        }
+    }
+
+    // "Carga" de la aplicación: el buscador aparece al terminar
+    setTimeout(() => {
+        const buscador = crear('div', {contenteditable: 'true', 'data-tab': '3', 'aria-label': 'Buscar'});
+        buscador.addEventListener('input', () => pintarChats(buscador.textContent.trim()));
+        buscador.addEventListener('keydown', evento => {
+            if (evento.key !== 'Enter') return;
+            evento.preventDefault();
+            const primero = Object.keys(estado.comunidades).find(n => n.includes(buscador.textContent.trim()));
+            if (primero) despues(() => abrirChat(primero));
+        });
+        lado.append(buscador, crear('div', {id: 'pane-side'}));
+        pintarChats('');
+        if (location.pathname === '/send') abrirEnlace();
+    }, config.latencia_carga_ms);
+})();
@@ -0,0 +1,121 @@
+"""
+Servidor local del simulador de WhatsApp Web (benchmark/mock_whatsapp)
+Sirve las páginas estáticas y /config.json con las comunidades, la latencia
+y la probabilidad de fallo que se inyectan en la interfaz.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import threading
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+DIRECTORIO_MOCK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_whatsapp")
+
+
+def crear_configuracion(comunidades=3, miembros=20, latencia_ms=150, variacion_ms=100,
+                        prob_fallo=0.0, latencia_carga_ms=1000, sin_whatsapp=(), semilla=None):
+    """Configuración del simulador: comunidades con miembros (números sin '+') y parámetros de inyección"""
+    aleatorio = random.Random(semilla)
+    return {
+        # Cambia en cada arranque: el navegador descarta el estado guardado de la corrida anterior
+        'version': f"{time.time():.6f}",
+        'comunidades': {
+            f"🟠 Comunidad Prueba {n}": [f"573{aleatorio.randrange(10**9):09d}" for _ in range(miembros)]
+            for n in range(1, comunidades + 1)
+        },
+        'sin_whatsapp': [numero.lstrip('+') for numero in sin_whatsapp],
+        'latencia_ms': latencia_ms,
+        'variacion_ms': variacion_ms,
+        'prob_fallo': prob_fallo,
+        'latencia_carga_ms': latencia_carga_ms,
+    }
+
+
+class ManejadorMock(SimpleHTTPRequestHandler):
+    """Archivos estáticos del simulador, /config.json y la aplicación en cualquier otra ruta"""
+
+    def __init__(self, *args, configuracion=None, latencia_http_ms=0, **kwargs):
+        self.configuracion = configuracion
+        self.latencia_http_ms = latencia_http_ms
+        super().__init__(*args, directory=DIRECTORIO_MOCK, **kwargs)
+
+    def do_GET(self):
+        if self.latencia_http_ms:
+            time.sleep(self.latencia_http_ms / 1000)
+
+        ruta = self.path.split('?', 1)[0]
+        if ruta == '/config.json':
+            cuerpo = json.dumps(self.configuracion, ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(cuerpo)))
+            self.send_header('Cache-Control', 'no-store')
+            self.end_headers()
+            self.wfile.write(cuerpo)
+            return
+
+        # /, /send?phone=... y demás rutas de la aplicación: la misma página
+        if not os.path.splitext(ruta)[1]:
+            self.path = '/index.html'
+        super().do_GET()
+
+    def log_message(self, formato, *args):
+        pass
+
+
+class ServidorMock:
+    """Servidor del simulador en un hilo de fondo (puerto=0 elige uno libre)"""
+
+    def __init__(self, configuracion, puerto=0, latencia_http_ms=0):
+        manejador = partial(ManejadorMock, configuracion=configuracion, latencia_http_ms=latencia_http_ms)
+        self.servidor = ThreadingHTTPServer(('127.0.0.1', puerto), manejador)
+        self.hilo = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.servidor.server_address[1]}"
+
+    def iniciar(self):
+        self.hilo = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self.hilo.start()
+        return self
+
+    def detener(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Simulador local de WhatsApp Web")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--comunidades", type=int, default=3)
+    parser.add_argument("--miembros", type=int, default=20, help="Miembros iniciales por comunidad")
+    parser.add_argument("--latencia-ms", type=int, default=150, help="Latencia base de cada transición de la interfaz")
+    parser.add_argument("--variacion-ms", type=int, default=100, help="Variación aleatoria sumada a la latencia")
+    parser.add_argument("--latencia-carga-ms", type=int, default=1000, help="Tiempo hasta que aparece el buscador")
+    parser.add_argument("--latencia-http-ms", type=int, default=0, help="Demora de cada respuesta HTTP")
+    parser.add_argument("--prob-fallo", type=float, default=0.0, help="Probabilidad de que falle cada número añadido")
+    parser.add_argument("--sin-whatsapp", nargs="*", default=[], metavar="NUMERO",
+                        help="Números que el simulador trata como no registrados en WhatsApp")
+    args = parser.parse_args()
+
+    configuracion = crear_configuracion(
+        comunidades=args.comunidades, miembros=args.miembros, latencia_ms=args.latencia_ms,
+        variacion_ms=args.variacion_ms, prob_fallo=args.prob_fallo,
+        latencia_carga_ms=args.latencia_carga_ms, sin_whatsapp=args.sin_whatsapp,
+    )
+    servidor = ServidorMock(configuracion, args.puerto, args.latencia_http_ms)
+    print(f"🧪 Simulador de WhatsApp en {servidor.url} (Ctrl+C para salir)")
+    for nombre in configuracion['comunidades']:
+        print(f"   • {nombre}")
+    try:
+        servidor.servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.servidor.server_close()
+        sys.exit(0)
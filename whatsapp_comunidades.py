@@ -7,10 +7,28 @@ Agrega y elimina personas de comunidades de WhatsApp de forma automatizada
 import os
 import sys
 import time
+import argparse
+import csv
+import json
 import random
 import re
-import pandas as pd
+import math
+import itertools
+import sqlite3
+import multiprocessing
+import queue
+import threading
+import subprocess
+from contextlib import contextmanager
 from datetime import datetime
+from functools import wraps, partial
+from importlib.util import find_spec
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Tiempo de importación de las dependencias pesadas (se informa al arrancar)
+_INICIO_IMPORTACION = time.perf_counter()
+
+import pandas as pd
 
 def instalar_dependencias():
     """Instalar dependencias necesarias"""
@@ -30,11 +48,14 @@ def instalar_dependencias():
             print(f"✅ {nombre_paquete} ya está instalado")
         except ImportError:
             print(f"📦 Instalando {paquete}...")
-            import subprocess
             subprocess.check_call([sys.executable, '-m', 'pip', 'install', paquete])
 
-# Instalar dependencias
-instalar_dependencias()
+# Verificar dependencias solo si se pide (--instalar-dependencias o
+# INSTALAR_DEPENDENCIAS=1) o si falta alguna: así el arranque no llama a pip
+if '--instalar-dependencias' in sys.argv or os.environ.get('INSTALAR_DEPENDENCIAS') == '1':
+    instalar_dependencias()
+elif any(find_spec(modulo) is None for modulo in ('selenium', 'webdriver_manager', 'openpyxl')):
+    instalar_dependencias()
 
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -44,22 +65,1687 @@ from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.action_chains import ActionChains
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import (
+    TimeoutException, StaleElementReferenceException, NoSuchElementException
+)
+
+TIEMPO_IMPORTACION = time.perf_counter() - _INICIO_IMPORTACION
+
+
+# Escanea en el navegador todos los candidatos de una lista de XPaths en una
+# sola llamada: devuelve el elemento con sus títulos, rol, texto y visibilidad.
+JS_ESCANEAR_ELEMENTOS = """
+const [xpaths, contiene, soloVisibles, limite] = arguments;
+const salida = [];
+for (let origen = 0; origen < xpaths.length; origen++) {
+    const nodos = document.evaluate(xpaths[origen], document, null,
+                                    XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    for (let i = 0; i < nodos.snapshotLength; i++) {
+        const el = nodos.snapshotItem(i);
+        if (!(el instanceof Element)) continue;
+        const caja = el.getBoundingClientRect();
+        const estilo = window.getComputedStyle(el);
+        const visible = caja.width > 0 && caja.height > 0 &&
+                        estilo.visibility !== 'hidden' && estilo.display !== 'none';
+        if (soloVisibles && !visible) continue;
+        const titulos = Array.from(el.querySelectorAll('[title]')).map(t => t.getAttribute('title'));
+        if (el.hasAttribute('title')) titulos.unshift(el.getAttribute('title'));
+        if (contiene && !titulos.some(t => t && t.includes(contiene))) continue;
+        salida.push({
+            elemento: el,
+            origen: origen,
+            indice: i,
+            titulos: titulos,
+            role: el.getAttribute('role'),
+            aria_label: el.getAttribute('aria-label'),
+            texto: (el.innerText || el.textContent || '').trim().slice(0, 2000),
+            visible: visible,
+            habilitado: !el.disabled && el.getAttribute('aria-disabled') !== 'true',
+        });
+        if (limite && salida.length >= limite) return salida;
+    }
+}
+return salida;
+"""
+
+# Lee los títulos de la lista de miembros visible dentro de la raíz (XPath) y
+# desplaza la lista una página. fin=true cuando ya no se puede desplazar más.
+JS_LEER_MIEMBROS = """
+const raiz = document.evaluate(arguments[0], document, null,
+    XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue || document.body;
+const titulos = [];
+for (const fila of raiz.querySelectorAll('[role="listitem"], [role="row"]')) {
+    const span = fila.querySelector('span[title]');
+    if (span) titulos.push(span.getAttribute('title'));
+}
+let contenedor = raiz.querySelector('[role="listitem"], [role="row"]');
+while (contenedor && contenedor !== raiz && contenedor.scrollHeight <= contenedor.clientHeight + 1) {
+    contenedor = contenedor.parentElement;
+}
+let fin = true;
+if (contenedor && contenedor.scrollHeight > contenedor.clientHeight + 1) {
+    const antes = contenedor.scrollTop;
+    contenedor.scrollTop = antes + Math.max(1, contenedor.clientHeight * 0.8);
+    fin = contenedor.scrollTop === antes;
+}
+return {titulos: titulos, fin: fin};
+"""
+
+# Reemplaza el contenido de un campo editable con el texto completo en un solo
+# evento de edición (insertText; si el editor lo rechaza, un pegado sintético).
+# A diferencia de send_keys admite emojis fuera del BMP y no depende del largo.
+JS_ESCRIBIR_TEXTO = """
+const [campo, texto] = arguments;
+(campo.closest('[contenteditable="true"]') || campo).focus();
+const seleccion = window.getSelection();
+const rango = document.createRange();
+rango.selectNodeContents(campo);
+seleccion.removeAllRanges();
+seleccion.addRange(rango);
+const aceptado = texto ? document.execCommand('insertText', false, texto) : document.execCommand('delete');
+if (!aceptado && texto) {
+    const datos = new DataTransfer();
+    datos.setData('text/plain', texto);
+    campo.dispatchEvent(new ClipboardEvent('paste', {clipboardData: datos, bubbles: true, cancelable: true}));
+}
+// WhatsApp pinta los emojis como <img alt="🟠">: leerlos desde alt
+const leer = nodo => Array.from(nodo.childNodes).map(
+    hijo => hijo.nodeType === Node.TEXT_NODE ? hijo.nodeValue : hijo.nodeName === 'IMG' ? (hijo.alt || '') : leer(hijo)
+).join('');
+return leer(campo);
+"""
+
+# Posición de un resultado dentro de la lista de chats y su título
+JS_POSICION_RESULTADO = """
+const filas = Array.from(document.querySelectorAll('#pane-side [role="listitem"], #pane-side [role="row"]'));
+const span = arguments[0].querySelector('span[title]');
+return [filas.indexOf(arguments[0]), span ? span.getAttribute('title') : null];
+"""
+
+# Modo liviano: sin animaciones ni transiciones en todas las páginas
+JS_SIN_ANIMACIONES = """
+const estilo = document.createElement('style');
+estilo.textContent = '*, *::before, *::after { animation: none !important; transition: none !important; }';
+document.addEventListener('DOMContentLoaded', () => document.head.appendChild(estilo));
+"""
+
+# Modo liviano: avatares, imágenes, stickers y videos que la automatización no usa
+URLS_MEDIOS_BLOQUEADOS = [
+    "*://pps.whatsapp.net/*",  # Fotos de perfil
+    "*://mmg.whatsapp.net/*",  # Medios de los mensajes
+    "*://media*.cdn.whatsapp.net/*",
+    "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.mp4", "*.ogg", "*.opus",
+]
+
+COLUMNAS_REQUERIDAS = ['Comunidad_Agregar', 'Celular_Agregar', 'Comunidad_Eliminar', 'Celular_Eliminar']
+EXTENSIONES_ENTRADA = ('.xlsx', '.csv', '.parquet')
+
+# Códigos de salida de main()
+SALIDA_OK = 0
+SALIDA_ERROR = 1  # No se pudo abrir WhatsApp, leer el archivo o configurar la corrida (también opciones inválidas)
+SALIDA_CON_FALLOS = 3  # La corrida terminó pero algunas operaciones fallaron (2 es el de uso de argparse)
+SALIDA_INTERRUMPIDA = 130  # Ctrl+C
+
+
+class Operacion:
+    """Operación pendiente: agregar o eliminar un número de una comunidad"""
+
+    __slots__ = ('tipo', 'comunidad', 'celular', 'fila')
+
+    def __init__(self, tipo, comunidad, celular, fila):
+        self.tipo = tipo
+        self.comunidad = comunidad
+        self.celular = celular
+        self.fila = fila
+
+    def __repr__(self):
+        return f"Operacion({self.tipo!r}, {self.comunidad!r}, {self.celular!r}, fila={self.fila})"
+
+
+def normalizar_celulares(celulares, prefijo_pais='57', longitud_nacional=10):
+    """Convertir una serie de celulares al formato E.164 (+<país><número>)
+
+    Acepta números nacionales de longitud_nacional dígitos, números que ya
+    traen el prefijo del país y números internacionales con '+' o '00'. Los
+    valores con una longitud inválida quedan como NA.
+    """
+    prefijo_pais = str(prefijo_pais).lstrip('+')
+    texto = celulares.astype('string').str.strip().str.replace(r'\.0+$', '', regex=True)
+
+    con_ceros = texto.str.startswith('00').fillna(False)
+    internacional = texto.str.startswith('+').fillna(False) | con_ceros
+    digitos = texto.str.replace(r'\D', '', regex=True)
+    digitos = digitos.mask(con_ceros, digitos.str[2:])
+    largo = digitos.str.len().fillna(0)
+
+    nacional = ~internacional & (largo == longitud_nacional)
+    con_prefijo = (~internacional & (largo == len(prefijo_pais) + longitud_nacional)
+                   & digitos.str.startswith(prefijo_pais).fillna(False))
+    internacional_valido = internacional & largo.between(8, 15)
+
+    e164 = pd.Series(pd.NA, index=celulares.index, dtype='string')
+    e164 = e164.mask(nacional, '+' + prefijo_pais + digitos)
+    e164 = e164.mask(con_prefijo | internacional_valido, '+' + digitos)
+    return e164
+
+
+def celulares_en_texto(texto, prefijo_pais='57', longitud_nacional=10):
+    """Conjunto de números E.164 que aparecen escritos en un texto
+
+    Cada número se toma completo (con sus espacios, guiones o paréntesis) y se
+    normaliza, así un número no coincide con un pedazo de otro más largo.
+    """
+    candidatos = re.findall(r'\+?\d[\d \u00a0\-().]{6,}\d', texto or '')
+    celulares = pd.Series(candidatos, dtype=object)
+    return set(normalizar_celulares(celulares, prefijo_pais, longitud_nacional).dropna())
+
+
+def _valor_celda(valor):
+    """Texto limpio de una celda ('' si está vacía, sin el .0 de los números de Excel)"""
+    if valor is None:
+        return ''
+    if isinstance(valor, float):
+        if valor != valor:  # NaN
+            return ''
+        if valor.is_integer():
+            return str(int(valor))
+    return str(valor).strip()
+
+
+def leer_filas(archivo):
+    """Leer las filas de un .xlsx, .csv o .parquet una por una sin cargar todo el archivo
+
+    La primera fila que se genera es el encabezado.
+    """
+    extension = os.path.splitext(archivo)[1].lower()
+
+    if extension == '.csv':
+        with open(archivo, newline='', encoding='utf-8-sig') as f:
+            yield from csv.reader(f)
+
+    elif extension == '.parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Para leer .parquet instala pyarrow: pip install pyarrow")
+        parquet = pq.ParquetFile(archivo)
+        yield parquet.schema_arrow.names
+        for lote in parquet.iter_batches(batch_size=10000):
+            yield from zip(*(columna.to_pylist() for columna in lote.columns))
+
+    else:
+        import openpyxl
+        libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+        try:
+            yield from libro.active.iter_rows(values_only=True)
+        finally:
+            libro.close()
+
+
+def leer_operaciones(archivo, limite=None):
+    """Generar las operaciones del archivo de forma perezosa
+
+    Cada fila puede producir una operación 'agregar' y una 'eliminar'. Con
+    limite solo se leen las primeras filas de datos.
+    """
+    filas = leer_filas(archivo)
+    encabezado = [_valor_celda(celda) for celda in next(filas, ())]
+    print(f"\n📋 Columnas encontradas: {encabezado}")
+
+    faltantes = [columna for columna in COLUMNAS_REQUERIDAS if columna not in encabezado]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en {archivo}: {faltantes}")
+    indices = [encabezado.index(columna) for columna in COLUMNAS_REQUERIDAS]
+
+    for i, fila in enumerate(itertools.islice(filas, limite)):
+        comunidad_agregar, celular_agregar, comunidad_eliminar, celular_eliminar = (
+            _valor_celda(fila[j]) if j < len(fila) else '' for j in indices
+        )
+
+        # PROCESO 1: AGREGAR
+        if comunidad_agregar and celular_agregar:
+            yield Operacion('agregar', comunidad_agregar, celular_agregar, i + 1)
+
+        # PROCESO 2: ELIMINAR
+        if comunidad_eliminar and celular_eliminar:
+            yield Operacion('eliminar', comunidad_eliminar, celular_eliminar, i + 1)
+
+
+EMOJIS_COLOR = ('🟠', '🟢', '🔴', '🟡', '🔵', '🟣', '🟤', '⚫', '⚪',
+                '🟥', '🟧', '🟨', '🟩', '🟦', '🟪', '🟫')
+PATRON_EMOJI_COLOR = re.compile('|'.join(EMOJIS_COLOR))
+PATRON_EMOJIS = re.compile("["
+    u"\U0001F600-\U0001F64F"  # emoticones
+    u"\U0001F300-\U0001F5FF"  # símbolos & pictogramas
+    u"\U0001F680-\U0001F6FF"  # transporte & símbolos
+    u"\U0001F1E0-\U0001F1FF"  # banderas
+    u"\U00002702-\U000027B0"
+    u"\U000024C2-\U0001F251"
+    u"\U0001f926-\U0001f937"
+    u"\U00010000-\U0010ffff"
+    u"\u2640-\u2642"
+    u"\u2600-\u2B55"
+    u"\u200d"
+    u"\u23cf"
+    u"\u23e9"
+    u"\u231a"
+    u"\ufe0f"
+    u"\u3030"
+    "]+", flags=re.UNICODE)
+
+
+def emoji_color(texto):
+    """Emoji de color del texto o None"""
+    encontrado = PATRON_EMOJI_COLOR.search(texto)
+    return encontrado.group() if encontrado else None
+
+
+def texto_sin_emojis(texto):
+    """Texto sin emojis, que ChromeDriver sí puede escribir"""
+    # Quitar los caracteres fuera del BMP; si quedó muy corto, también el resto de emojis
+    texto_limpio = ''.join(char for char in texto if ord(char) < 0x10000)
+    if len(texto_limpio.strip()) < 3:
+        texto_limpio = PATRON_EMOJIS.sub('', texto)
+    return texto_limpio.strip()
+
+
+def literal_xpath(texto):
+    """Literal de XPath 1.0 para un texto con cualquier comilla
+
+    XPath no tiene escapes: si el texto trae ambas comillas se arma con concat().
+    """
+    if "'" not in texto:
+        return f"'{texto}'"
+    if '"' not in texto:
+        return f'"{texto}"'
+    partes = ", \"'\", ".join(f"'{parte}'" for parte in texto.split("'"))
+    return f"concat({partes})"
+
+
+class ClaveComunidad:
+    """Datos precalculados para buscar una comunidad
+
+    busqueda es el nombre sin emojis; grupo son los nombres del archivo que
+    comparten esa misma búsqueda (comunidades que solo se distinguen por el
+    emoji de color).
+    """
+
+    __slots__ = ('nombre', 'busqueda', 'color', 'grupo')
+
+    def __init__(self, nombre, busqueda, color, grupo):
+        self.nombre = nombre
+        self.busqueda = busqueda
+        self.color = color
+        self.grupo = grupo
+
+    def __repr__(self):
+        return f"ClaveComunidad({self.nombre!r}, busqueda={self.busqueda!r}, color={self.color!r}, grupo={len(self.grupo)})"
+
+
+class IndiceComunidades:
+    """Resolución de nombres de comunidades: claves de búsqueda y resultados conocidos
+
+    Las claves se calculan una vez por nombre distinto del archivo. El
+    resultado (título y posición en la lista de chats) que abrió cada
+    comunidad se guarda en SQLite: con ese título la comunidad se abre
+    directo desde la lista de chats y, si hay que buscarla, se va directo al
+    resultado correcto. Se olvida cuando la comunidad deja de encontrarse.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.claves = {}  # {nombre: ClaveComunidad}
+        self.grupos = {}  # {busqueda: [nombres]}
+        self.conexion = sqlite3.connect(ruta, timeout=30)
+        self.conexion.execute("""
+            CREATE TABLE IF NOT EXISTS resultados (
+                comunidad TEXT PRIMARY KEY,
+                titulo TEXT NOT NULL,
+                posicion INTEGER NOT NULL,
+                fecha REAL NOT NULL
+            )
+        """)
+        self.conexion.commit()
+
+    def registrar(self, nombres):
+        """Agregar los nombres nuevos; devuelve los grupos de nombres que chocan"""
+        nuevos = [nombre for nombre in dict.fromkeys(nombres) if nombre not in self.claves]
+        tocados = set()
+        for nombre in nuevos:
+            busqueda = texto_sin_emojis(nombre)
+            grupo = self.grupos.setdefault(busqueda, [])
+            grupo.append(nombre)
+            self.claves[nombre] = ClaveComunidad(nombre, busqueda, emoji_color(nombre), grupo)
+            tocados.add(busqueda)
+        return [self.grupos[busqueda] for busqueda in tocados if len(self.grupos[busqueda]) > 1]
+
+    def clave(self, nombre):
+        if nombre not in self.claves:
+            self.registrar([nombre])
+        return self.claves[nombre]
+
+    def resultado(self, comunidad):
+        """(título, posición) del resultado que abrió la comunidad la última vez, o None"""
+        return self.conexion.execute(
+            "SELECT titulo, posicion FROM resultados WHERE comunidad = ?", (comunidad,)
+        ).fetchone()
+
+    def guardar_resultado(self, comunidad, titulo, posicion):
+        with self.conexion:
+            self.conexion.execute(
+                "INSERT OR REPLACE INTO resultados (comunidad, titulo, posicion, fecha) VALUES (?, ?, ?, ?)",
+                (comunidad, titulo, posicion, time.time())
+            )
+
+    def olvidar_resultado(self, comunidad):
+        with self.conexion:
+            self.conexion.execute("DELETE FROM resultados WHERE comunidad = ?", (comunidad,))
+
+    def cerrar(self):
+        self.conexion.close()
+
+
+def cargar_configuracion(ruta):
+    """Leer un archivo de configuración .toml, .yaml/.yml o .json como diccionario
+
+    Las claves son los nombres de las opciones de la línea de comandos, con
+    '-' o '_' (por ejemplo prefijo-pais o prefijo_pais).
+    """
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension == '.toml':
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            import tomli as tomllib
+        with open(ruta, 'rb') as f:
+            datos = tomllib.load(f)
+    elif extension in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("Para leer configuración YAML instala PyYAML (pip install pyyaml)")
+        with open(ruta, encoding='utf-8') as f:
+            datos = yaml.safe_load(f) or {}
+    elif extension == '.json':
+        with open(ruta, encoding='utf-8') as f:
+            datos = json.load(f)
+    else:
+        raise ValueError(f"Formato de configuración no soportado: {ruta} (usa .toml, .yaml o .json)")
+
+    if not isinstance(datos, dict):
+        raise ValueError(f"La configuración de {ruta} debe ser una tabla de opciones")
+    return {clave.replace('-', '_'): valor for clave, valor in datos.items()}
+
+
+class ErrorWhatsApp(Exception):
+    """Error conocido mostrado por WhatsApp Web (no se pudo añadir, privacidad, etc.)"""
+
+    def __init__(self, motivo, texto=""):
+        self.motivo = motivo
+        self.texto = texto
+        super().__init__(f"{motivo}: {texto}" if texto else motivo)
+
+
+@contextmanager
+def archivo_bloqueado(ruta, timeout=30):
+    """Bloquear un archivo compartido entre procesos mientras dura el bloque
+
+    Usa un archivo .lock creado de forma exclusiva, así funciona igual en
+    Windows y en Linux. Un .lock más viejo que timeout segundos se considera
+    abandonado por un proceso que se cayó.
+    """
+    candado = f"{ruta}.lock"
+    while True:
+        try:
+            os.close(os.open(candado, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(candado) > timeout:
+                    os.remove(candado)
+                    continue
+            except OSError:
+                continue
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        try:
+            os.remove(candado)
+        except OSError:
+            pass
+
+
+class RegistroSelectores:
+    """Estadísticas de aciertos, fallos y latencia por estrategia de selector
+
+    Ordena las estrategias de cada clave para probar primero la que mejor ha
+    funcionado y guarda las estadísticas en JSON para las siguientes corridas.
+    Al guardar se suman solo los resultados nuevos de este proceso a lo que
+    haya en el archivo, así varias cuentas en paralelo no se pisan.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.stats = {}
+        self.nuevas = {}  # Resultados de este proceso todavía sin guardar
+        try:
+            if os.path.exists(ruta):
+                with open(ruta, encoding='utf-8') as f:
+                    self.stats = json.load(f)
+        except Exception as e:
+            print(f"⚠️ No se pudieron leer las estadísticas de selectores: {e}")
+            self.stats = {}
+
+    def _puntaje(self, clave, estrategia):
+        """Tasa de acierto suavizada (mayor es mejor) y latencia media (menor es mejor)"""
+        datos = self.stats.get(clave, {}).get(estrategia, {})
+        aciertos = datos.get('aciertos', 0)
+        fallos = datos.get('fallos', 0)
+        tasa = (aciertos + 1) / (aciertos + fallos + 2)
+        latencia = datos.get('latencia_total', 0.0) / aciertos if aciertos else float('inf')
+        return (-tasa, latencia)
+
+    def ordenar(self, clave, estrategias):
+        """Devolver las estrategias [(nombre, valor), ...] en el orden aprendido"""
+        orden = {nombre: i for i, (nombre, _) in enumerate(estrategias)}
+        return sorted(estrategias, key=lambda e: (*self._puntaje(clave, e[0]), orden[e[0]]))
+
+    @staticmethod
+    def _sumar(stats, clave, estrategia, aciertos=0, fallos=0, latencia_total=0.0):
+        datos = stats.setdefault(clave, {}).setdefault(
+            estrategia, {'aciertos': 0, 'fallos': 0, 'latencia_total': 0.0}
+        )
+        datos['aciertos'] += aciertos
+        datos['fallos'] += fallos
+        datos['latencia_total'] += latencia_total
+
+    def registrar(self, clave, estrategia, exito, latencia=0.0):
+        """Registrar el resultado de una estrategia"""
+        valores = {'aciertos': 1, 'latencia_total': latencia} if exito else {'fallos': 1}
+        self._sumar(self.stats, clave, estrategia, **valores)
+        self._sumar(self.nuevas, clave, estrategia, **valores)
+
+    def guardar(self):
+        """Sumar los resultados nuevos a las estadísticas en disco"""
+        try:
+            with archivo_bloqueado(self.ruta):
+                stats = {}
+                if os.path.exists(self.ruta):
+                    with open(self.ruta, encoding='utf-8') as f:
+                        stats = json.load(f)
+                for clave, estrategias in self.nuevas.items():
+                    for estrategia, datos in estrategias.items():
+                        self._sumar(stats, clave, estrategia, **datos)
+
+                temporal = f"{self.ruta}.{os.getpid()}.tmp"
+                with open(temporal, 'w', encoding='utf-8') as f:
+                    json.dump(stats, f, indent=2, ensure_ascii=False)
+                os.replace(temporal, self.ruta)
+            self.stats = stats
+            self.nuevas = {}
+        except Exception as e:
+            print(f"⚠️ No se pudieron guardar las estadísticas de selectores: {e}")
+
+
+class ControladorRitmo:
+    """Ritmo adaptativo entre acciones: cubeta de fichas con ajuste AIMD
+
+    Cada acción en WhatsApp (abrir una comunidad, un diálogo de añadir o una
+    eliminación) consume una ficha y las fichas se reponen a ops_por_minuto.
+    Cada éxito sube el ritmo en incremento (aumento aditivo); un fallo, una
+    respuesta lenta de la interfaz o un aviso de límite lo multiplican por un
+    factor menor que 1 (disminución multiplicativa). Lo lento se mide contra
+    la duración media de cada tipo de acción (por número en los lotes). El
+    ritmo aprendido se guarda por cuenta para la siguiente corrida.
+    """
+
+    def __init__(self, ruta, cuenta, ops_por_minuto=8.0, minimo=1.0, maximo=30.0):
+        self.ruta = ruta
+        self.cuenta = cuenta
+        self.minimo = minimo
+        self.maximo = maximo
+        self.incremento = 0.5  # ops/min que se suman con cada éxito
+        self.factor_lento = 0.85
+        self.factor_fallo = 0.7
+        self.factor_limite = 0.5
+        self.capacidad = 1.0  # Fichas acumulables: 1 = sin ráfagas
+        self.ops_por_minuto = ops_por_minuto
+        self.duraciones_medias = {}  # Media móvil de la duración por tipo de acción
+        self.aprendido = False
+
+        try:
+            if os.path.exists(ruta):
+                with open(ruta, encoding='utf-8') as f:
+                    datos = json.load(f).get(cuenta)
+                if datos:
+                    self.ops_por_minuto = datos['ops_por_minuto']
+                    self.duraciones_medias = datos.get('duraciones_medias', {})
+                    self.aprendido = True
+        except Exception as e:
+            print(f"⚠️ No se pudo leer el ritmo guardado: {e}")
+
+        self.ops_por_minuto = min(self.maximo, max(self.minimo, self.ops_por_minuto))
+        self.fichas = self.capacidad
+        self.ultima_reposicion = time.monotonic()
+
+    def por_defecto(self, ops_por_minuto):
+        """Usar este ritmo inicial si todavía no hay uno aprendido"""
+        if not self.aprendido:
+            self.ops_por_minuto = min(self.maximo, max(self.minimo, ops_por_minuto))
+
+    def _reponer(self):
+        ahora = time.monotonic()
+        self.fichas = min(self.capacidad,
+                          self.fichas + (ahora - self.ultima_reposicion) * self.ops_por_minuto / 60)
+        self.ultima_reposicion = ahora
+
+    def esperar(self, fichas=1):
+        """Esperar hasta tener las fichas de la siguiente acción y consumirlas"""
+        self._reponer()
+        faltan = fichas - self.fichas
+        if faltan > 0:
+            # Variación aleatoria para no repetir un intervalo exacto
+            segundos = faltan * 60 / self.ops_por_minuto * random.uniform(0.8, 1.2)
+            print(f"⏳ Esperando {segundos:.1f} segundos (ritmo {self.ops_por_minuto:.1f} ops/min)...")
+            time.sleep(segundos)
+            self._reponer()
+        self.fichas -= fichas
+
+    def registrar(self, exito, duracion=None, limite=False, tipo='accion', cantidad=1):
+        """Ajustar el ritmo con el resultado y la duración de una acción
+
+        Con cantidad > 1 (un lote) la duración se compara por número.
+        """
+        lento = False
+        if duracion is not None:
+            duracion /= max(1, cantidad)
+            media = self.duraciones_medias.get(tipo)
+            lento = media is not None and duracion > 2 * media
+            self.duraciones_medias[tipo] = duracion if media is None else 0.8 * media + 0.2 * duracion
+
+        anterior = self.ops_por_minuto
+        if limite:
+            self.ops_por_minuto *= self.factor_limite
+            # Pausa extra: la siguiente acción espera una ficha adicional
+            self.fichas = min(self.fichas, 0) - 1
+        elif not exito:
+            self.ops_por_minuto *= self.factor_fallo
+        elif lento:
+            self.ops_por_minuto *= self.factor_lento
+        else:
+            self.ops_por_minuto += self.incremento
+        self.ops_por_minuto = min(self.maximo, max(self.minimo, self.ops_por_minuto))
+
+        if self.ops_por_minuto < anterior:
+            causa = 'aviso de límite' if limite else 'fallo' if not exito else 'interfaz lenta'
+            print(f"🐢 Ritmo baja a {self.ops_por_minuto:.1f} ops/min ({causa})")
+
+    def guardar(self):
+        """Guardar el ritmo aprendido de esta cuenta sin tocar el de las otras"""
+        try:
+            # Otros procesos (una cuenta cada uno) guardan en el mismo archivo
+            with archivo_bloqueado(self.ruta):
+                datos = {}
+                if os.path.exists(self.ruta):
+                    with open(self.ruta, encoding='utf-8') as f:
+                        datos = json.load(f)
+                datos[self.cuenta] = {
+                    'ops_por_minuto': round(self.ops_por_minuto, 3),
+                    'duraciones_medias': self.duraciones_medias,
+                    'fecha': datetime.now().isoformat(timespec='seconds'),
+                }
+                temporal = f"{self.ruta}.{os.getpid()}.tmp"
+                with open(temporal, 'w', encoding='utf-8') as f:
+                    json.dump(datos, f, indent=2, ensure_ascii=False)
+                os.replace(temporal, self.ruta)
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar el ritmo: {e}")
+
+
+class DiarioProgreso:
+    """Diario JSONL de solo anexado con el resultado de cada operación
+
+    Cada línea se escribe con flush + fsync apenas termina la operación, así
+    una caída de Chrome, un cierre de sesión o Ctrl+C no pierden el avance.
+    Con reanudar=True se cargan las operaciones exitosas desde el último
+    inicio sin reanudar para saltarlas.
+    """
+
+    def __init__(self, ruta, reanudar=False):
+        self.ruta = ruta
+        self.completadas = self._cargar_completadas() if reanudar else set()
+        self.archivo = open(ruta, 'a', encoding='utf-8')
+        self._escribir({'evento': 'inicio', 'reanudar': reanudar})
+
+    @staticmethod
+    def clave(operacion):
+        """Identificador de una operación del plan"""
+        return f"{operacion.fila}|{operacion.tipo}|{operacion.comunidad}|{operacion.celular}"
+
+    def _cargar_completadas(self):
+        completadas = set()
+        if not os.path.exists(self.ruta):
+            return completadas
+
+        with open(self.ruta, encoding='utf-8') as f:
+            for linea in f:
+                try:
+                    registro = json.loads(linea)
+                except ValueError:
+                    # Última línea cortada por una caída
+                    continue
+                if registro.get('evento') == 'inicio' and not registro.get('reanudar'):
+                    completadas = set()
+                elif registro.get('evento') == 'operacion' and registro.get('exito'):
+                    completadas.add(registro['clave'])
+        return completadas
+
+    def _escribir(self, registro):
+        registro['fecha'] = datetime.now().isoformat(timespec='seconds')
+        self.archivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        self.archivo.flush()
+        os.fsync(self.archivo.fileno())
+
+    def completada(self, operacion):
+        return self.clave(operacion) in self.completadas
+
+    def registrar(self, operacion, exito):
+        """Anotar el resultado de una operación"""
+        clave = self.clave(operacion)
+        if exito:
+            self.completadas.add(clave)
+        self._escribir({
+            'evento': 'operacion',
+            'clave': clave,
+            'tipo': operacion.tipo,
+            'comunidad': operacion.comunidad,
+            'celular': operacion.celular,
+            'fila': operacion.fila,
+            'exito': bool(exito),
+        })
+
+    def cerrar(self):
+        if not self.archivo.closed:
+            self.archivo.close()
+
+
+class IndiceMiembros:
+    """Índice local (SQLite) con los miembros de cada comunidad
+
+    Cada comunidad tiene una instantánea con la fecha en que se leyó su lista
+    de miembros. completa=False indica que algunos miembros aparecían con su
+    nombre de contacto en lugar del número: en ese caso un número ausente no
+    prueba que no sea miembro.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.conexion = sqlite3.connect(ruta, timeout=30)
+        self.conexion.executescript("""
+            CREATE TABLE IF NOT EXISTS instantaneas (
+                comunidad TEXT PRIMARY KEY,
+                fecha REAL NOT NULL,
+                completa INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS miembros (
+                comunidad TEXT NOT NULL,
+                celular TEXT NOT NULL,
+                PRIMARY KEY (comunidad, celular)
+            );
+        """)
+
+    def instantanea(self, comunidad, vigencia):
+        """(miembros, completa) si hay una instantánea de menos de vigencia segundos, si no None"""
+        fila = self.conexion.execute(
+            "SELECT fecha, completa FROM instantaneas WHERE comunidad = ?", (comunidad,)
+        ).fetchone()
+        if not fila or time.time() - fila[0] > vigencia:
+            return None
+
+        miembros = {celular for (celular,) in self.conexion.execute(
+            "SELECT celular FROM miembros WHERE comunidad = ?", (comunidad,)
+        )}
+        return miembros, bool(fila[1])
+
+    def guardar_instantanea(self, comunidad, miembros, completa):
+        """Reemplazar la lista de miembros de la comunidad"""
+        with self.conexion:
+            self.conexion.execute("DELETE FROM miembros WHERE comunidad = ?", (comunidad,))
+            self.conexion.executemany(
+                "INSERT OR IGNORE INTO miembros (comunidad, celular) VALUES (?, ?)",
+                ((comunidad, celular) for celular in miembros)
+            )
+            self.conexion.execute(
+                "INSERT OR REPLACE INTO instantaneas (comunidad, fecha, completa) VALUES (?, ?, ?)",
+                (comunidad, time.time(), int(completa))
+            )
+
+    def marcar(self, comunidad, celular, es_miembro):
+        """Actualizar un número después de agregarlo o eliminarlo con éxito"""
+        with self.conexion:
+            if es_miembro:
+                self.conexion.execute(
+                    "INSERT OR IGNORE INTO miembros (comunidad, celular) VALUES (?, ?)", (comunidad, celular)
+                )
+            else:
+                self.conexion.execute(
+                    "DELETE FROM miembros WHERE comunidad = ? AND celular = ?", (comunidad, celular)
+                )
+
+    def cerrar(self):
+        self.conexion.close()
+
+
+class CacheNumeros:
+    """Caché persistente (SQLite) de qué números están en WhatsApp
+
+    Cada resultado vence según su vigencia, así un número que se registra en
+    WhatsApp más adelante vuelve a verificarse.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.conexion = sqlite3.connect(ruta, timeout=30)
+        self.conexion.execute("""
+            CREATE TABLE IF NOT EXISTS numeros (
+                celular TEXT PRIMARY KEY,
+                en_whatsapp INTEGER NOT NULL,
+                fecha REAL NOT NULL
+            )
+        """)
+        self.conexion.commit()
+
+    def consultar(self, celulares, vigencia_valido, vigencia_invalido):
+        """{celular: True/False} para los números con un resultado vigente"""
+        celulares = list(celulares)
+        ahora = time.time()
+        conocidos = {}
+        # SQLite limita la cantidad de parámetros por consulta
+        for inicio in range(0, len(celulares), 500):
+            parte = celulares[inicio:inicio + 500]
+            filas = self.conexion.execute(
+                f"SELECT celular, en_whatsapp, fecha FROM numeros WHERE celular IN ({','.join('?' * len(parte))})",
+                parte
+            )
+            for celular, en_whatsapp, fecha in filas:
+                vigencia = vigencia_valido if en_whatsapp else vigencia_invalido
+                if ahora - fecha <= vigencia:
+                    conocidos[celular] = bool(en_whatsapp)
+        return conocidos
+
+    def guardar(self, celular, en_whatsapp):
+        with self.conexion:
+            self.conexion.execute(
+                "INSERT OR REPLACE INTO numeros (celular, en_whatsapp, fecha) VALUES (?, ?, ?)",
+                (celular, int(en_whatsapp), time.time())
+            )
+
+    def cerrar(self):
+        self.conexion.close()
+
+
+class CuotasOperaciones:
+    """Cuotas por hora y por día de cada tipo de operación, por cuenta
+
+    Los límites se leen de un JSON con una entrada 'por_defecto' y entradas
+    opcionales por cuenta (nombre de la carpeta de sesión):
+
+        {"por_defecto": {"agregar": {"hora": 60, "dia": 400}},
+         "whatsapp_session_2": {"eliminar": {"hora": 50, "dia": null}}}
+
+    null o una ventana ausente quedan sin límite: no hay cuotas inventadas,
+    solo las del archivo. Las operaciones hechas se guardan en SQLite, así las ventanas siguen contando entre corridas y entre días.
+    Dentro de la hora las operaciones se reparten parejo (una cada
+    3600/hora segundos) en lugar de gastar la cuota en una ráfaga.
+    """
+
+    VENTANAS = {'hora': 3600, 'dia': 86400}
+
+    def __init__(self, ruta_uso, ruta_config, cuenta):
+        self.cuenta = cuenta
+        self.limites = {}
+        try:
+            if os.path.exists(ruta_config):
+                with open(ruta_config, encoding='utf-8') as f:
+                    config = json.load(f)
+                for clave in ('por_defecto', cuenta):
+                    for tipo, valores in (config.get(clave) or {}).items():
+                        self.limites.setdefault(tipo, {}).update(valores)
+        except Exception as e:
+            print(f"⚠️ No se pudieron leer las cuotas de {ruta_config}: {e}")
+
+        self.conexion = sqlite3.connect(ruta_uso, timeout=30)
+        self.conexion.execute("""
+            CREATE TABLE IF NOT EXISTS uso (
+                cuenta TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                momento REAL NOT NULL,
+                cantidad INTEGER NOT NULL
+            )
+        """)
+        self.conexion.execute("CREATE INDEX IF NOT EXISTS uso_cuenta ON uso (cuenta, tipo, momento)")
+        with self.conexion:
+            # Lo anterior a la ventana más larga ya no cuenta
+            self.conexion.execute("DELETE FROM uso WHERE momento < ?", (time.time() - max(self.VENTANAS.values()),))
+
+    def limite(self, tipo, ventana):
+        valor = self.limites.get(tipo, {}).get(ventana)
+        return None if valor is None else max(1, int(valor))
+
+    def _usadas(self, tipo, desde):
+        fila = self.conexion.execute(
+            "SELECT COALESCE(SUM(cantidad), 0) FROM uso WHERE cuenta = ? AND tipo = ? AND momento > ?",
+            (self.cuenta, tipo, desde)
+        ).fetchone()
+        return fila[0]
+
+    def _liberacion(self, tipo, desde, sobran):
+        """Momento en que vence la operación que deja libres 'sobran' lugares en la ventana"""
+        acumulado = 0
+        for momento, cantidad in self.conexion.execute(
+            "SELECT momento, cantidad FROM uso WHERE cuenta = ? AND tipo = ? AND momento > ? ORDER BY momento",
+            (self.cuenta, tipo, desde)
+        ):
+            acumulado += cantidad
+            if acumulado >= sobran:
+                return momento
+        return desde
+
+    def cupo(self, tipo, maximo):
+        """(operaciones permitidas ahora, segundos de espera si no hay ninguna)"""
+        ahora = time.time()
+        disponibles = maximo
+        espera = 0.0
+        for ventana, duracion in self.VENTANAS.items():
+            limite = self.limite(tipo, ventana)
+            if limite is None:
+                continue
+            libres = limite - self._usadas(tipo, ahora - duracion)
+            if libres <= 0:
+                vence = self._liberacion(tipo, ahora - duracion, 1 - libres)
+                espera = max(espera, vence + duracion - ahora)
+            disponibles = min(disponibles, libres)
+
+        # Reparto parejo dentro de la hora
+        limite_hora = self.limite(tipo, 'hora')
+        if limite_hora is not None:
+            ultima = self.conexion.execute(
+                "SELECT momento, cantidad FROM uso WHERE cuenta = ? AND tipo = ? ORDER BY momento DESC LIMIT 1",
+                (self.cuenta, tipo)
+            ).fetchone()
+            if ultima:
+                espera = max(espera, ultima[0] + ultima[1] * 3600 / limite_hora - ahora)
+
+        if espera > 0:
+            return 0, espera
+        return max(0, disponibles), 0.0
+
+    def esperar(self, tipo, maximo=1):
+        """Esperar a que la cuota permita operar y devolver cuántas operaciones caben (1..maximo)"""
+        while True:
+            disponibles, espera = self.cupo(tipo, maximo)
+            if disponibles > 0:
+                return disponibles
+            reanudar = datetime.fromtimestamp(time.time() + espera).strftime('%Y-%m-%d %H:%M:%S')
+            if espera > 60:
+                print(f"🕐 Cuota de '{tipo}' agotada: esperando hasta {reanudar}...")
+            time.sleep(espera)
+
+    def registrar(self, tipo, cantidad):
+        """Anotar operaciones ya enviadas a WhatsApp (cuentan aunque fallen)"""
+        if cantidad <= 0:
+            return
+        with self.conexion:
+            self.conexion.execute(
+                "INSERT INTO uso (cuenta, tipo, momento, cantidad) VALUES (?, ?, ?, ?)",
+                (self.cuenta, tipo, time.time(), cantidad)
+            )
+
+    def estimar(self, conteos):
+        """Mostrar cuánto tardarán las operaciones planificadas con las cuotas actuales"""
+        for tipo, cantidad in conteos.items():
+            limite_hora = self.limite(tipo, 'hora')
+            limite_dia = self.limite(tipo, 'dia')
+            if not cantidad or (limite_hora is None and limite_dia is None):
+                continue
+            horas = cantidad / limite_hora if limite_hora else 0
+            if limite_dia:
+                # Lo que no cabe en la cuota de hoy espera a las ventanas de los días siguientes
+                excedente = cantidad - (limite_dia - self._usadas(tipo, time.time() - 86400))
+                if excedente > 0:
+                    horas = max(horas, 24 * math.ceil(excedente / limite_dia))
+            print(f"🕐 {cantidad} operaciones de '{tipo}' (cuota {limite_hora or '∞'}/hora, "
+                  f"{limite_dia or '∞'}/día): unas {horas:.1f} horas")
+
+    def cerrar(self):
+        self.conexion.close()
+
+
+class MetricasPasos:
+    """Duración, fallos y reintentos de cada paso con nombre
+
+    Guarda las duraciones de cada paso para calcular percentiles y las
+    exporta a JSON y al formato de texto de Prometheus.
+    """
+
+    # Límites (segundos) de los buckets del histograma de Prometheus
+    LIMITES = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+    def __init__(self):
+        self.duraciones = {}  # {paso: [segundos, ...]}
+        self.fallos = {}  # {paso: {motivo: cantidad}}
+        self.reintentos = {}  # {paso: cantidad}
+
+    @contextmanager
+    def medir(self, paso):
+        """Medir un bloque; una excepción cuenta como fallo (motivo: su tipo)"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.registrar(paso, time.perf_counter() - inicio, getattr(e, 'motivo', type(e).__name__))
+            raise
+        self.registrar(paso, time.perf_counter() - inicio)
+
+    def registrar(self, paso, segundos, fallo=None):
+        self.duraciones.setdefault(paso, []).append(segundos)
+        if fallo:
+            fallos = self.fallos.setdefault(paso, {})
+            fallos[fallo] = fallos.get(fallo, 0) + 1
+
+    def reintento(self, paso):
+        self.reintentos[paso] = self.reintentos.get(paso, 0) + 1
+
+    def datos(self):
+        """Métricas en un diccionario serializable (para pasarlas entre procesos)"""
+        return {'duraciones': self.duraciones, 'fallos': self.fallos, 'reintentos': self.reintentos}
+
+    def combinar(self, datos):
+        """Sumar las métricas de otro proceso"""
+        for paso, duraciones in datos['duraciones'].items():
+            self.duraciones.setdefault(paso, []).extend(duraciones)
+        for paso, fallos in datos['fallos'].items():
+            for motivo, cantidad in fallos.items():
+                propios = self.fallos.setdefault(paso, {})
+                propios[motivo] = propios.get(motivo, 0) + cantidad
+        for paso, cantidad in datos['reintentos'].items():
+            self.reintentos[paso] = self.reintentos.get(paso, 0) + cantidad
+
+    @staticmethod
+    def percentil(valores, p):
+        """Percentil p (0-100) por rango más cercano"""
+        ordenados = sorted(valores)
+        return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+    def resumen(self):
+        """{paso: {cantidad, fallos, reintentos, total, p50, p95, max}} ordenado por tiempo total"""
+        resumen = {}
+        for paso, duraciones in sorted(self.duraciones.items(), key=lambda item: -sum(item[1])):
+            resumen[paso] = {
+                'cantidad': len(duraciones),
+                'fallos': sum(self.fallos.get(paso, {}).values()),
+                'reintentos': self.reintentos.get(paso, 0),
+                'total': round(sum(duraciones), 3),
+                'p50': round(self.percentil(duraciones, 50), 3),
+                'p95': round(self.percentil(duraciones, 95), 3),
+                'max': round(max(duraciones), 3),
+            }
+        return resumen
+
+    def exportar_json(self, ruta, motivos_error=None):
+        """Escribir resumen, buckets, fallos y reintentos en un archivo JSON"""
+        datos = {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'pasos': self.resumen(),
+            'histogramas': {
+                paso: {str(limite): sum(1 for d in duraciones if d <= limite) for limite in self.LIMITES}
+                for paso, duraciones in self.duraciones.items()
+            },
+            'fallos': self.fallos,
+            'reintentos': self.reintentos,
+            'motivos_error': motivos_error or {},
+        }
+        temporal = f"{ruta}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, ensure_ascii=False, indent=2)
+        os.replace(temporal, ruta)
+
+    @staticmethod
+    def _etiqueta(valor):
+        return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    def exportar_prometheus(self, ruta, motivos_error=None):
+        """Escribir las métricas en el formato de texto de Prometheus"""
+        lineas = [
+            "# HELP whatsapp_paso_segundos Duración de cada paso en segundos",
+            "# TYPE whatsapp_paso_segundos histogram",
+        ]
+        for paso, duraciones in self.duraciones.items():
+            etiqueta = self._etiqueta(paso)
+            for limite in self.LIMITES:
+                cantidad = sum(1 for d in duraciones if d <= limite)
+                lineas.append(f'whatsapp_paso_segundos_bucket{{paso="{etiqueta}",le="{limite}"}} {cantidad}')
+            lineas.append(f'whatsapp_paso_segundos_bucket{{paso="{etiqueta}",le="+Inf"}} {len(duraciones)}')
+            lineas.append(f'whatsapp_paso_segundos_sum{{paso="{etiqueta}"}} {sum(duraciones):.6f}')
+            lineas.append(f'whatsapp_paso_segundos_count{{paso="{etiqueta}"}} {len(duraciones)}')
+
+        lineas += [
+            "# HELP whatsapp_paso_fallos_total Fallos de cada paso por motivo",
+            "# TYPE whatsapp_paso_fallos_total counter",
+        ]
+        for paso, fallos in self.fallos.items():
+            for motivo, cantidad in fallos.items():
+                lineas.append(f'whatsapp_paso_fallos_total{{paso="{self._etiqueta(paso)}",'
+                              f'motivo="{self._etiqueta(motivo)}"}} {cantidad}')
+
+        lineas += [
+            "# HELP whatsapp_paso_reintentos_total Reintentos de cada paso",
+            "# TYPE whatsapp_paso_reintentos_total counter",
+        ]
+        for paso, cantidad in self.reintentos.items():
+            lineas.append(f'whatsapp_paso_reintentos_total{{paso="{self._etiqueta(paso)}"}} {cantidad}')
+
+        lineas += [
+            "# HELP whatsapp_errores_total Errores conocidos de WhatsApp por motivo",
+            "# TYPE whatsapp_errores_total counter",
+        ]
+        for motivo, cantidad in (motivos_error or {}).items():
+            lineas.append(f'whatsapp_errores_total{{motivo="{self._etiqueta(motivo)}"}} {cantidad}')
+
+        temporal = f"{ruta}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lineas) + "\n")
+        os.replace(temporal, ruta)
+
+
+def medido(paso):
+    """Decorador: medir un método del gestor como paso (devolver False cuenta como fallo)"""
+    def decorador(metodo):
+        @wraps(metodo)
+        def envoltura(self, *args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                resultado = metodo(self, *args, **kwargs)
+            except Exception as e:
+                self.metricas.registrar(paso, time.perf_counter() - inicio, getattr(e, 'motivo', type(e).__name__))
+                raise
+            self.metricas.registrar(paso, time.perf_counter() - inicio, 'fallo' if resultado is False else None)
+            return resultado
+        return envoltura
+    return decorador
+
+
+class _SalidaConPrefijo:
+    """Antepone la cuenta a cada línea impresa por un proceso trabajador"""
+
+    def __init__(self, salida, prefijo):
+        self.salida = salida
+        self.prefijo = prefijo
+        self.inicio_linea = True
+
+    def write(self, texto):
+        for parte in texto.splitlines(True):
+            if self.inicio_linea:
+                self.salida.write(self.prefijo)
+            self.salida.write(parte)
+            self.inicio_linea = parte.endswith("\n")
+        return len(texto)
+
+    def flush(self):
+        self.salida.flush()
+
+
+def _ejecutar_cuenta(indice, parametros, ruta_diario, pedidos, cola):
+    """Proceso trabajador: abre su propio Chrome una sola vez y atiende los pedidos del coordinador
+
+    Los pedidos llegan por la cola pedidos: ('plan', plan) ejecuta su parte
+    de un bloque, ('verificar', celulares) verifica números en WhatsApp y
+    None termina el proceso.
+    """
+    sys.stdout = _SalidaConPrefijo(sys.stdout, f"[cuenta {indice + 1}] ")
+
+    gestor = GestorComunidadesWhatsApp()
+    for nombre, valor in parametros.items():
+        setattr(gestor, nombre, valor)
+    gestor.usar_cache = os.path.exists(gestor.session_path) and len(os.listdir(gestor.session_path)) > 0
+    # Cada cuenta aprende y guarda su propio ritmo
+    gestor.ritmo = gestor.crear_ritmo()
+
+    try:
+        listo = gestor.configurar_navegador() and gestor.iniciar_whatsapp()
+        if listo and ruta_diario:
+            # Solo anexar: el coordinador ya filtró las operaciones completadas
+            gestor.diario = DiarioProgreso(ruta_diario, reanudar=True)
+
+        for tipo, datos in iter(pedidos.get, None):
+            if tipo == 'verificar':
+                cola.put(('verificar', indice, gestor.verificar_pendientes(datos) if listo else {}))
+                continue
+
+            estadisticas = GestorComunidadesWhatsApp.estadisticas_vacias()
+            try:
+                if listo:
+                    estadisticas = gestor.ejecutar_plan(datos)
+                else:
+                    for operaciones in datos.values():
+                        for operacion in operaciones:
+                            estadisticas[GestorComunidadesWhatsApp.clave_estadistica(operacion, False)] += 1
+            except Exception as e:
+                print(f"❌ Error general en la cuenta: {e}")
+            cola.put(('plan', indice, estadisticas, gestor.motivos_error, gestor.metricas.datos()))
+            # Lo ya reportado no se vuelve a sumar con el siguiente bloque
+            gestor.motivos_error = {}
+            gestor.metricas = MetricasPasos()
+    except Exception as e:
+        print(f"❌ Error general en la cuenta: {e}")
+    finally:
+        if gestor.diario:
+            gestor.diario.cerrar()
+        gestor.selectores.guardar()
+        gestor.ritmo.guardar()
+        gestor.indice_miembros.cerrar()
+        gestor.cache_numeros.cerrar()
+        gestor.indice_comunidades.cerrar()
+        if gestor.cuotas:
+            gestor.cuotas.cerrar()
+        if gestor.driver:
+            gestor.driver.quit()
+
+
+class CoordinadorCuentas:
+    """Reparte el trabajo entre varias cuentas administradoras, un proceso por cuenta
+
+    Los procesos se inician una sola vez por corrida y reciben cada bloque del
+    plan por una cola, así Chrome y WhatsApp Web se abren una vez por cuenta.
+    Cada comunidad se asigna a una sola cuenta, así dos navegadores nunca
+    trabajan sobre la misma comunidad a la vez.
+    """
+
+    def __init__(self, gestor, sesiones):
+        self.gestor = gestor
+        self.sesiones = sesiones
+        self.procesos = []  # [(indice, proceso, cola de pedidos)]
+        self.respuestas = None
+
+    @staticmethod
+    def repartir(plan, cantidad):
+        """Repartir comunidades entre cantidad cuentas equilibrando operaciones
+
+        Asigna primero las comunidades más grandes a la cuenta menos cargada;
+        cada parte conserva el orden original de las comunidades.
+        """
+        asignacion = {}
+        cargas = [0] * cantidad
+        for comunidad in sorted(plan, key=lambda c: len(plan[c]), reverse=True):
+            cuenta = cargas.index(min(cargas))
+            asignacion[comunidad] = cuenta
+            cargas[cuenta] += len(plan[comunidad])
+
+        partes = [{} for _ in range(cantidad)]
+        for comunidad, operaciones in plan.items():
+            partes[asignacion[comunidad]][comunidad] = operaciones
+        return partes
+
+    def iniciar(self):
+        """Lanzar un proceso trabajador por cuenta"""
+        ruta_diario = self.gestor.diario.ruta if self.gestor.diario else None
+        self.respuestas = multiprocessing.Queue()
+
+        print(f"\n👥 Iniciando {len(self.sesiones)} cuentas en paralelo")
+        for indice, sesion in enumerate(self.sesiones):
+            print(f"   • Cuenta {indice + 1}: {sesion}")
+            sys.stdout.flush()
+            pedidos = multiprocessing.Queue()
+            proceso = multiprocessing.Process(
+                target=_ejecutar_cuenta,
+                args=(indice, self.gestor.parametros_cuenta(sesion), ruta_diario, pedidos, self.respuestas),
+            )
+            proceso.start()
+            self.procesos.append((indice, proceso, pedidos))
+
+    def _vivas(self):
+        return [(indice, pedidos) for indice, proceso, pedidos in self.procesos if proceso.is_alive()]
+
+    def _esperar(self, pendientes):
+        """Devolver (índice, datos) de cada cuenta pendiente a medida que responde
+
+        Una cuenta que murió sin responder devuelve datos None.
+        """
+        pendientes = set(pendientes)
+        while pendientes:
+            try:
+                _, indice, *datos = self.respuestas.get(timeout=5)
+            except queue.Empty:
+                for indice, proceso, _ in self.procesos:
+                    if indice in pendientes and not proceso.is_alive() and self.respuestas.empty():
+                        pendientes.discard(indice)
+                        yield indice, None
+                continue
+            if indice in pendientes:
+                pendientes.discard(indice)
+                yield indice, datos
+
+    def ejecutar(self, plan):
+        """Ejecutar un bloque del plan en paralelo y combinar las estadísticas"""
+        estadisticas = GestorComunidadesWhatsApp.estadisticas_vacias()
+        vivas = self._vivas()
+        if not vivas:
+            print("❌ No queda ninguna cuenta activa")
+            for operaciones in plan.values():
+                for operacion in operaciones:
+                    estadisticas[GestorComunidadesWhatsApp.clave_estadistica(operacion, False)] += 1
+            return estadisticas
+
+        print(f"\n👥 Repartiendo {len(plan)} comunidades entre {len(vivas)} cuentas")
+        asignadas = {}
+        for (indice, pedidos), parte in zip(vivas, self.repartir(plan, len(vivas))):
+            if not parte:
+                continue
+            operaciones = sum(len(ops) for ops in parte.values())
+            print(f"   • Cuenta {indice + 1}: {len(parte)} comunidades, {operaciones} operaciones")
+            sys.stdout.flush()
+            pedidos.put(('plan', parte))
+            asignadas[indice] = parte
+
+        for indice, datos in self._esperar(asignadas):
+            if datos is None:
+                # Un proceso que murió sin reportar cuenta todas sus operaciones como error
+                print(f"❌ La cuenta {indice + 1} terminó sin reportar resultados")
+                for operaciones in asignadas[indice].values():
+                    for operacion in operaciones:
+                        estadisticas[GestorComunidadesWhatsApp.clave_estadistica(operacion, False)] += 1
+                continue
+
+            parciales, motivos, metricas = datos
+            for clave, valor in parciales.items():
+                estadisticas[clave] += valor
+            for motivo, cantidad in motivos.items():
+                self.gestor.motivos_error[motivo] = self.gestor.motivos_error.get(motivo, 0) + cantidad
+            self.gestor.metricas.combinar(metricas)
+        return estadisticas
+
+    def verificar(self, celulares):
+        """Verificar números en WhatsApp repartiéndolos entre las cuentas activas"""
+        vivas = self._vivas()
+        asignadas = []
+        for n, (indice, pedidos) in enumerate(vivas):
+            parte = celulares[n::len(vivas)]
+            if parte:
+                pedidos.put(('verificar', parte))
+                asignadas.append(indice)
+
+        verificados = {}
+        for _, datos in self._esperar(asignadas):
+            if datos:
+                verificados.update(datos[0])
+        return verificados
+
+    def cerrar(self):
+        """Terminar los procesos trabajadores"""
+        for _, proceso, pedidos in self.procesos:
+            if proceso.is_alive():
+                pedidos.put(None)
+        for _, proceso, _ in self.procesos:
+            proceso.join(timeout=120)
+            if proceso.is_alive():
+                proceso.terminate()
+        self.procesos = []
+
+
+class ManejadorTrabajos(BaseHTTPRequestHandler):
+    """API HTTP local del modo servicio
+
+    GET  /estado          sesión, trabajo actual y trabajos en cola
+    GET  /trabajos        todos los trabajos
+    GET  /trabajos/<id>   un trabajo con su estado y estadísticas
+    POST /trabajos        {"archivo": ruta, "limite": n, "reanudar": bool}
+                          o {"operaciones": [{"tipo", "comunidad", "celular"}, ...]}
+    POST /detener         terminar después del trabajo actual
+    """
+
+    def __init__(self, *args, servicio=None, **kwargs):
+        self.servicio = servicio
+        super().__init__(*args, **kwargs)
+
+    def responder(self, estado, datos):
+        cuerpo = json.dumps(datos, ensure_ascii=False, indent=2).encode('utf-8')
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        ruta = self.path.split('?', 1)[0].rstrip('/')
+        if ruta == '/estado':
+            self.responder(200, self.servicio.estado())
+        elif ruta == '/trabajos':
+            self.responder(200, self.servicio.listar())
+        elif ruta.startswith('/trabajos/'):
+            trabajo = self.servicio.consultar(ruta.rsplit('/', 1)[1])
+            if trabajo:
+                self.responder(200, trabajo)
+            else:
+                self.responder(404, {'error': 'Trabajo no encontrado'})
+        else:
+            self.responder(404, {'error': 'Ruta no encontrada'})
+
+    def do_POST(self):
+        ruta = self.path.split('?', 1)[0].rstrip('/')
+        if ruta == '/detener':
+            self.servicio.detener()
+            self.responder(202, {'estado': 'deteniendo'})
+            return
+        if ruta != '/trabajos':
+            self.responder(404, {'error': 'Ruta no encontrada'})
+            return
+
+        try:
+            largo = int(self.headers.get('Content-Length') or 0)
+            datos = json.loads(self.rfile.read(largo) or b'{}')
+            self.responder(202, self.servicio.encolar(datos))
+        except (ValueError, TypeError) as e:
+            self.responder(400, {'error': str(e)})
+
+    def log_message(self, formato, *args):
+        pass
+
+
+class ServicioTrabajos:
+    """Modo servicio: una sesión de WhatsApp Web siempre abierta y una cola de trabajos
+
+    El navegador se abre una sola vez al arrancar. Los trabajos llegan por
+    la API HTTP local (solo 127.0.0.1) y se ejecutan de a uno en el hilo
+    principal, que es el único que usa el navegador. Mientras no hay
+    trabajos se revisa cada cierto tiempo que la sesión siga viva.
+    """
+
+    def __init__(self, gestor, puerto=8787):
+        self.gestor = gestor
+        self.cola = queue.Queue()
+        self.trabajos = {}
+        self.candado = threading.Lock()
+        self.contador = itertools.count(1)
+        self.actual = None
+        self.deteniendo = False
+        self.intervalo_revision = 60  # Segundos sin trabajos entre revisiones de la sesión
+        self.directorio = os.path.join(os.getcwd(), "trabajos")
+        self.servidor = ThreadingHTTPServer(('127.0.0.1', puerto), partial(ManejadorTrabajos, servicio=self))
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.servidor.server_address[1]}"
+
+    def encolar(self, datos):
+        """Validar un trabajo, ponerlo en la cola y devolver su estado"""
+        if not isinstance(datos, dict):
+            raise ValueError("El trabajo debe ser un objeto JSON")
+
+        if datos.get('archivo'):
+            archivo = os.path.abspath(datos['archivo'])
+            if not os.path.exists(archivo):
+                raise ValueError(f"No existe el archivo {archivo}")
+            if not archivo.lower().endswith(EXTENSIONES_ENTRADA):
+                raise ValueError(f"Formato no soportado (se aceptan {', '.join(EXTENSIONES_ENTRADA)})")
+            operaciones = None
+        elif isinstance(datos.get('operaciones'), list):
+            archivo = None
+            operaciones = []
+            for i, item in enumerate(datos['operaciones'], 1):
+                if not isinstance(item, dict) or item.get('tipo') not in ('agregar', 'eliminar'):
+                    raise ValueError(f"Operación {i}: 'tipo' debe ser 'agregar' o 'eliminar'")
+                if not item.get('comunidad') or not item.get('celular'):
+                    raise ValueError(f"Operación {i}: faltan 'comunidad' o 'celular'")
+                operaciones.append(Operacion(item['tipo'], str(item['comunidad']).strip(),
+                                             str(item['celular']).strip(), i))
+        else:
+            raise ValueError("El trabajo necesita 'archivo' o una lista de 'operaciones'")
+        limite = datos.get('limite')
+        if limite is not None:
+            limite = int(limite)
+
+        with self.candado:
+            identificador = str(next(self.contador))
+            trabajo = {
+                'id': identificador,
+                'estado': 'en_cola',
+                'archivo': archivo,
+                'operaciones': len(operaciones) if operaciones is not None else None,
+                'limite': limite,
+                'reanudar': bool(datos.get('reanudar')),
+                'creado': datetime.now().isoformat(timespec='seconds'),
+                'inicio': None,
+                'fin': None,
+                'estadisticas': None,
+                'error': None,
+            }
+            self.trabajos[identificador] = trabajo
+        self.cola.put((identificador, operaciones))
+        print(f"📥 Trabajo {identificador} en cola ({archivo or f'{len(operaciones)} operaciones'})")
+        return dict(trabajo)
+
+    def consultar(self, identificador):
+        with self.candado:
+            trabajo = self.trabajos.get(identificador)
+            return dict(trabajo) if trabajo else None
+
+    def listar(self):
+        with self.candado:
+            return [dict(trabajo) for trabajo in self.trabajos.values()]
+
+    def estado(self):
+        return {
+            'sesion': self.gestor.driver is not None,
+            'trabajo_actual': self.actual,
+            'en_cola': self.cola.qsize(),
+            'deteniendo': self.deteniendo,
+        }
+
+    def detener(self):
+        self.deteniendo = True
+        self.cola.put(None)
+
+    def _actualizar(self, identificador, **cambios):
+        with self.candado:
+            self.trabajos[identificador].update(cambios)
+
+    def _ejecutar_trabajo(self, identificador, operaciones):
+        trabajo = self.consultar(identificador)
+        self.actual = identificador
+        self._actualizar(identificador, estado='en_proceso', inicio=datetime.now().isoformat(timespec='seconds'))
+        print(f"\n▶️ Trabajo {identificador}")
+
+        gestor = self.gestor
+        archivo_rechazos = None
+        try:
+            if not gestor.sesion_activa() and not gestor.abrir_navegador():
+                raise RuntimeError("No se pudo abrir WhatsApp Web")
+
+            if trabajo['archivo']:
+                ruta_diario = f"{os.path.splitext(trabajo['archivo'])[0]}.progreso.jsonl"
+                gestor.diario = DiarioProgreso(ruta_diario, reanudar=trabajo['reanudar'])
+                operaciones = leer_operaciones(trabajo['archivo'], trabajo['limite'])
+
+            os.makedirs(self.directorio, exist_ok=True)
+            ruta_rechazos = os.path.join(self.directorio, f"{identificador}.rechazados.csv")
+            archivo_rechazos = open(ruta_rechazos, 'w', newline='', encoding='utf-8')
+            estadisticas = gestor.procesar_operaciones(iter(operaciones), ruta_rechazos, archivo_rechazos)
+            if estadisticas is None:
+                raise RuntimeError("No se pudo abrir WhatsApp Web")
+            self._actualizar(identificador, estado='terminado', estadisticas=estadisticas)
+            print(f"✅ Trabajo {identificador} terminado: {estadisticas}")
+        except Exception as e:
+            print(f"❌ Error en el trabajo {identificador}: {e}")
+            self._actualizar(identificador, estado='error', error=str(e))
+        finally:
+            if gestor.diario:
+                gestor.diario.cerrar()
+                gestor.diario = None
+            if archivo_rechazos:
+                archivo_rechazos.close()
+            gestor.selectores.guardar()
+            gestor.ritmo.guardar()
+            self._actualizar(identificador, fin=datetime.now().isoformat(timespec='seconds'))
+            self.actual = None
+
+    def atender(self):
+        """Servir la API y ejecutar los trabajos hasta recibir /detener o Ctrl+C"""
+        hilo = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        hilo.start()
+        print(f"🛰️ Servicio escuchando en {self.url} (POST /trabajos, GET /estado, POST /detener)")
+        try:
+            while True:
+                try:
+                    pendiente = self.cola.get(timeout=self.intervalo_revision)
+                except queue.Empty:
+                    # Sin trabajos: mantener la sesión abierta y reabrirla si se cayó
+                    if not self.gestor.sesion_activa():
+                        print("⚠️ La sesión de WhatsApp Web se cerró, abriéndola de nuevo...")
+                        self.gestor.abrir_navegador()
+                    continue
+                if pendiente is None:
+                    break
+                self._ejecutar_trabajo(*pendiente)
+        finally:
+            self.servidor.shutdown()
+            self.servidor.server_close()
 
 
 class GestorComunidadesWhatsApp:
+    # Estados de la interfaz que usan las esperas por condición
+    XPATH_BUSCADOR_CHATS = "//div[@contenteditable='true'][@data-tab='3']"
+    XPATH_CHAT_ABIERTO = ("//header[@data-testid='conversation-header'] | "
+                          "//div[@data-testid='conversation-panel-body'] | "
+                          "//div[contains(@class, 'copyable-area')]")
+    XPATH_PANEL_INFO = "//div[@role='button'][@data-tab='6'] | //button[@role='tab' and @title='Comunidad']"
+    XPATH_DIALOGO = "//div[@role='dialog']"
+    XPATH_SIN_RESULTADOS = "//span[contains(text(), 'No se encontr') or contains(text(), 'No results found')]"
+    # Fila del panel de miembros por sus clases; solo sirve si el filtro dejó una única fila
+    XPATH_FILA_UNICA_MIEMBRO = ("(//div[@role='dialog']//div[contains(@class, '_ak8l') and "
+                                "contains(@class, '_ap1_')])[last()=1]")
+
+    # Contenedores donde WhatsApp muestra sus avisos (diálogos y alertas); los
+    # errores se buscan solo ahí para no confundirlos con mensajes del chat
+    XPATH_AVISOS = "(//div[@role='dialog'] | //*[@role='alert'] | //*[@data-animate-modal-popup='true'])"
+
+    # Estados de error conocidos: se esperan junto con el estado de éxito para fallar de inmediato
+    ERRORES_CONOCIDOS = {
+        'privacidad': (f"{XPATH_AVISOS}//*[contains(text(), 'configuración de privacidad') or "
+                       "contains(text(), 'privacy settings')]"),
+        'no_esta_en_whatsapp': (f"{XPATH_AVISOS}//*[contains(text(), 'no está en WhatsApp') or "
+                                "contains(text(), 'not on WhatsApp') or "
+                                "contains(text(), 'URL no es válido') or "
+                                "contains(text(), 'url is invalid')]"),
+        'no_se_pudo_agregar': (f"{XPATH_AVISOS}//*[contains(text(), 'No se pudo añadir') or "
+                               "contains(text(), 'No se pudo agregar') or "
+                               "contains(text(), \"Couldn't add\")]"),
+        # Solo el texto exacto del diálogo de límite; frases sueltas como 'más tarde' dan falsos positivos
+        'limite_frecuencia': (f"{XPATH_DIALOGO}//*[contains(text(), 'Inténtalo de nuevo más tarde') or "
+                              "contains(text(), 'Vuelve a intentarlo más tarde') or "
+                              "contains(text(), 'Try again later')]"),
+        'sin_resultados': f"{XPATH_AVISOS}{XPATH_SIN_RESULTADOS}",
+    }
+
+    # Estrategias de localización por elemento; RegistroSelectores decide el orden.
+    # {numero} se reemplaza por el número con prefijo de país (solo dígitos).
+    SELECTORES = {
+        'boton_miembros': [
+            ('icono_search', "//div[@role='button' and contains(@class, 'x1ypdohk')]//span[@data-icon='search']/.."),
+            ('texto_miembros', "//span[contains(text(), 'miembros de la comunidad')]/ancestor::div[@role='button'][1]"),
+        ],
+        'campo_buscar_miembros': [
+            ('aria_label', "//div[@aria-label='Buscar miembros' and @contenteditable='true']"),
+            ('p_selectable', "//div[@aria-label='Buscar miembros']//p[contains(@class, 'selectable-text')]"),
+        ],
+        'contacto_miembro': [
+            ('titulo_numero', "//div[@role='dialog']//span[@title]"
+                              "[contains(translate(@title, ' +-()', ''), '{numero}')]"
+                              "/ancestor::div[@role='button' or @role='listitem'][1]"),
+        ],
+        'opcion_eliminar': [
+            ('span_clases', "//span[contains(@class, 'x1o2sk6j') and contains(text(), 'Eliminar de la comunidad')]"),
+            ('div_icono', "//svg[@data-icon='close-circle-refreshed']/ancestor::div[contains(@class, 'x1c4vz4f')][1]"),
+            ('span_texto', "//span[contains(text(), 'Eliminar de la comunidad')]"),
+        ],
+        'confirmar_eliminar': [
+            ('span_clases', "//span[contains(@class, 'x140p0ai') and text()='Eliminar']"),
+            ('boton_dialogo', "//div[@role='dialog']//*[@role='button' or self::button][.//span[text()='Eliminar']]"),
+        ],
+        'confirmar_anadir': [
+            ('div_clases', "//div[contains(@class, 'x1i10hfl') and contains(@class, 'x1qjc9v5')]"
+                           "//span[contains(text(), 'Añadir miembro')]"),
+            ('boton_dialogo', "//div[@role='dialog']//*[@role='button' or self::button]"
+                              "//span[contains(text(), 'Añadir miembro')]"),
+        ],
+    }
+
+    # Formas de abrir un resultado de búsqueda en la lista de chats
+    CLICS_RESULTADO = [
+        ('doble_clic', 'Doble clic'),
+        ('clic_simple', 'Clic simple'),
+        ('clic_js', 'Clic con JavaScript'),
+    ]
+
     def __init__(self):
         self.driver = None
         self.wait = None
         self.usar_cache = False
+        # Intervalo inicial entre acciones; luego el ritmo se adapta (ControladorRitmo)
         self.tiempo_min_contacto = 5
         self.tiempo_max_contacto = 10
-        self.tiempo_entre_procesos = 15
+        # Pausa anti-detección después de cada clic (0 = avanzar apenas la interfaz esté lista)
+        self.pausa_min_paso = 0.3
+        self.pausa_max_paso = 0.8
         self.session_path = os.path.join(os.getcwd(), "whatsapp_session")
+        self.url_whatsapp = "https://web.whatsapp.com"  # Otra URL para usar el simulador local (benchmark/)
+        self.headless = False  # Chrome sin ventana (solo con una sesión ya guardada)
+        self.modo_liviano = False  # Sin imágenes, medios, GPU ni animaciones; headless si hay sesión guardada
+        self.ruta_chromedriver = os.path.join(os.getcwd(), "chromedriver.json")  # Driver resuelto y su versión
+        self.actualizar_driver = False  # Resolver (y descargar si hace falta) el driver aunque haya uno guardado
         self.cantidad_procesar = None  # Cantidad de registros a procesar
+        self.interactivo = True  # False: sin preguntas ni pausas (cron, supervisor, uso como librería)
+        self.nueva_sesion = False  # Sin preguntas: escanear un QR nuevo aunque haya sesión guardada
+        self.estadisticas = None  # Estadísticas finales de procesar_excel
+        self.max_por_lote = 5  # Números seleccionados por diálogo "Añadir miembros"
+        self.comunidad_actual = None
+        self.total_miembros = None  # Cantidad del botón "N miembros de la comunidad" al abrir el panel
+        self.motivos_error = {}  # Conteo de errores conocidos por motivo
+        self.ultimo_error = None
+        self.operaciones_canceladas = 0  # Operaciones anuladas por otra posterior del mismo número
+        self.operaciones_omitidas = 0  # Operaciones que no cambiarían nada según el índice de miembros
+        self.indice_miembros = IndiceMiembros(os.path.join(os.getcwd(), "miembros_comunidades.sqlite"))
+        self.usar_instantanea = True  # Leer la lista de miembros para saltar operaciones sin efecto
+        self.vigencia_instantanea = 6 * 3600  # Segundos que una lista de miembros se considera vigente
+        self.min_operaciones_instantanea = 5  # Solo vale la pena leer la lista con al menos estas operaciones
+        self.cache_numeros = CacheNumeros(os.path.join(os.getcwd(), "numeros_whatsapp.sqlite"))
+        self.indice_comunidades = IndiceComunidades(os.path.join(os.getcwd(), "comunidades_whatsapp.sqlite"))
+        self.verificar_numeros = False  # Verificar en WhatsApp los números sin resultado en la caché
+        self.vigencia_numero_valido = 7 * 86400  # Segundos que vale un "sí está en WhatsApp"
+        self.vigencia_numero_invalido = 30 * 86400  # Segundos que vale un "no está en WhatsApp"
+        self.metricas = MetricasPasos()
+        self.metricas.registrar('arranque.importacion', TIEMPO_IMPORTACION)
+        self.ruta_metricas = os.path.join(os.getcwd(), "metricas_pasos")  # Sin extensión: .json y .prom
+        self.selectores = RegistroSelectores(os.path.join(os.getcwd(), "selectores_stats.json"))
+        self.ritmo = self.crear_ritmo()
+        self.usar_cuotas = True  # Respetar las cuotas de cuotas.json (si existe) por hora y por día
+        self.ruta_cuotas = os.path.join(os.getcwd(), "cuotas.json")
+        self.cuotas = None  # CuotasOperaciones de la cuenta; se abre con el primer plan
+        self.reanudar = False  # --resume: saltar operaciones ya completadas según el diario
+        self.diario = None
+        self.sesiones_cuentas = []  # Más de una sesión: un proceso por cuenta administradora
+        self.coordinador = None  # CoordinadorCuentas de la corrida (procesos iniciados con el primer bloque)
+        self.archivo_entrada = None  # None: buscar un archivo con 'comunidades' en el nombre
+        self.operaciones_por_bloque = 5000  # Operaciones leídas y planificadas a la vez
+        self.prefijo_pais = '57'  # Prefijo para los números sin código de país
+        self.longitud_celular = 10  # Dígitos de un número nacional
 
     def configurar_parametros(self):
-        """Configurar parámetros de tiempo y sesión"""
+        """Configurar parámetros de tiempo y sesión
+
+        Devuelve False si la corrida no puede continuar (sin preguntas, en
+        headless y sin sesión guardada no hay forma de escanear el QR).
+        """
         print("\n" + "="*60)
         print("⚙️ CONFIGURACIÓN DE PARÁMETROS")
         print("="*60)
@@ -67,6 +1753,9 @@ class GestorComunidadesWhatsApp:
         # Verificar si existe sesión guardada
         tiene_cache = os.path.exists(self.session_path) and len(os.listdir(self.session_path)) > 0
 
+        if not self.interactivo:
+            return self.configurar_sin_preguntas(tiene_cache)
+
         if tiene_cache:
             print("\n✅ Se encontró una sesión anterior guardada")
             print("¿Qué deseas hacer?")
@@ -91,15 +1780,20 @@ class GestorComunidadesWhatsApp:
         print("   Estos son los tiempos de espera entre procesar cada contacto")
 
         try:
-            self.tiempo_min_contacto = int(input("   ⏳ Tiempo MÍNIMO entre contactos (segundos, recomendado 5): ") or "5")
-            self.tiempo_max_contacto = int(input("   ⏳ Tiempo MÁXIMO entre contactos (segundos, recomendado 10): ") or "10")
+            self.tiempo_min_contacto = int(input(f"   ⏳ Tiempo MÍNIMO entre contactos (segundos, Enter = {self.tiempo_min_contacto}): ")
+                                           or self.tiempo_min_contacto)
+            self.tiempo_max_contacto = int(input(f"   ⏳ Tiempo MÁXIMO entre contactos (segundos, Enter = {self.tiempo_max_contacto}): ")
+                                           or self.tiempo_max_contacto)
         except:
             print("   ⚠️ Valores inválidos, usando valores por defecto (5-10 segundos)")
             self.tiempo_min_contacto = 5
             self.tiempo_max_contacto = 10
 
-        print(f"\n✅ Tiempo entre contactos: {self.tiempo_min_contacto}-{self.tiempo_max_contacto} segundos")
-        print(f"✅ Tiempo entre procesos (agregar→eliminar): {self.tiempo_entre_procesos} segundos")
+        print(f"\n✅ Tiempo inicial entre contactos: {self.tiempo_min_contacto}-{self.tiempo_max_contacto} segundos")
+        self.ritmo.por_defecto(self.ritmo_inicial())
+        if self.ritmo.aprendido:
+            print(f"✅ Ritmo aprendido en corridas anteriores: {self.ritmo.ops_por_minuto:.1f} acciones/min")
+        print("✅ El ritmo sube mientras todo funciona y baja ante fallos, lentitud o avisos de límite")
 
         # Configurar cantidad de registros a procesar
         print("\n" + "="*60)
@@ -126,53 +1820,41 @@ class GestorComunidadesWhatsApp:
         else:
             self.cantidad_procesar = None  # None significa todos
             print("✅ Se procesarán TODOS los registros")
+        return True
+
+    def configurar_sin_preguntas(self, tiene_cache):
+        """Configuración para correr sin operador: todo viene de opciones o del archivo de configuración"""
+        self.usar_cache = tiene_cache and not self.nueva_sesion
+        if self.usar_cache:
+            print(f"\n✅ Usando la sesión guardada en {self.session_path}")
+        elif self.headless:
+            print(f"\n❌ No hay sesión guardada en {self.session_path} y en headless no se puede escanear el QR")
+            print("💡 Ejecuta una vez con ventana para vincular la cuenta")
+            return False
+        else:
+            print("\n📱 Sin sesión guardada: escanea el QR en la ventana del navegador")
+
+        self.ritmo.por_defecto(self.ritmo_inicial())
+        print(f"✅ Tiempo inicial entre contactos: {self.tiempo_min_contacto}-{self.tiempo_max_contacto} segundos "
+              f"(ritmo {self.ritmo.ops_por_minuto:.1f} acciones/min)")
+        if self.cantidad_procesar is None:
+            print("✅ Se procesarán TODOS los registros")
+        else:
+            print(f"✅ Se procesarán {self.cantidad_procesar} registros")
+        return True
 
     def extraer_emoji_color(self, texto):
         """Extraer el emoji de color del texto si existe"""
-        emojis_colores = ['🟠', '🟢', '🔴', '🟡', '🔵', '🟣', '🟤', '⚫', '⚪',
-                        '🟥', '🟧', '🟨', '🟩', '🟦', '🟪', '🟫']
-
-        for emoji in emojis_colores:
-            if emoji in texto:
-                return emoji
-        return None
+        return emoji_color(texto)
 
     def limpiar_texto_para_selenium(self, texto):
         """Limpiar emojis del texto para que ChromeDriver pueda escribirlo"""
         try:
-            # NUEVA ESTRATEGIA: Siempre limpiar emojis para la búsqueda
-            # porque ChromeDriver no puede escribir emojis fuera del BMP
-            # Luego buscaremos por el texto limpio y filtraremos por emoji
-
-            # Remover TODOS los emojis
-            texto_limpio = ''.join(char for char in texto if ord(char) < 0x10000)
-
-            # Si quedó muy corto, usar patrón regex más agresivo
-            if len(texto_limpio.strip()) < 3:
-                emoji_pattern = re.compile("["
-                    u"\U0001F600-\U0001F64F"  # emoticones
-                    u"\U0001F300-\U0001F5FF"  # símbolos & pictogramas
-                    u"\U0001F680-\U0001F6FF"  # transporte & símbolos
-                    u"\U0001F1E0-\U0001F1FF"  # banderas
-                    u"\U00002702-\U000027B0"
-                    u"\U000024C2-\U0001F251"
-                    u"\U0001f926-\U0001f937"
-                    u"\U00010000-\U0010ffff"
-                    u"\u2640-\u2642"
-                    u"\u2600-\u2B55"
-                    u"\u200d"
-                    u"\u23cf"
-                    u"\u23e9"
-                    u"\u231a"
-                    u"\ufe0f"
-                    u"\u3030"
-                    "]+", flags=re.UNICODE)
-                texto_limpio = emoji_pattern.sub(r'', texto)
-
-            return texto_limpio.strip()
+            return texto_sin_emojis(texto)
         except:
             return texto
 
+    @medido('configurar_navegador')
     def configurar_navegador(self):
         """Configurar navegador Chrome con WhatsApp Web"""
         try:
@@ -184,8 +1866,25 @@ class GestorComunidadesWhatsApp:
             options.add_argument(f"--user-data-dir={self.session_path}")
             options.add_argument("--profile-directory=Default")
 
-            # Configuración para parecer más humano
-            options.add_argument("--start-maximized")
+            # En modo liviano, con la sesión ya guardada no hace falta ver el QR
+            headless = self.headless or (self.modo_liviano and self.usar_cache)
+            if headless:
+                options.add_argument("--headless=new")
+
+            if self.modo_liviano:
+                # Ventana chica fija, sin GPU, sin imágenes, sin audio ni video automático
+                options.add_argument("--window-size=1024,768")
+                options.add_argument("--disable-gpu")
+                options.add_argument("--blink-settings=imagesEnabled=false")
+                options.add_argument("--force-prefers-reduced-motion")
+                options.add_argument("--autoplay-policy=user-gesture-required")
+                options.add_argument("--mute-audio")
+                options.add_argument("--disable-extensions")
+            elif headless:
+                options.add_argument("--window-size=1280,900")
+            else:
+                # Configuración para parecer más humano
+                options.add_argument("--start-maximized")
             options.add_argument("--disable-blink-features=AutomationControlled")
             options.add_experimental_option("excludeSwitches", ["enable-automation"])
             options.add_experimental_option('useAutomationExtension', False)
@@ -195,18 +1894,36 @@ class GestorComunidadesWhatsApp:
                 "profile.default_content_setting_values.notifications": 2,  # Bloquear notificaciones
                 "profile.default_content_setting_values.media_stream": 1,   # Permitir micrófono/cámara si es necesario
             }
+            if self.modo_liviano:
+                prefs["profile.managed_default_content_settings.images"] = 2  # No cargar imágenes
             options.add_experimental_option("prefs", prefs)
 
-            # Configurar servicio
-            service = Service(ChromeDriverManager().install())
-
-            # Inicializar driver
-            self.driver = webdriver.Chrome(service=service, options=options)
+            # Driver guardado (sin red); si no arranca, por ejemplo porque Chrome
+            # se actualizó, se resuelve de nuevo una sola vez
+            with self.metricas.medir('arranque.resolver_driver'):
+                ruta_driver = self.resolver_chromedriver(self.actualizar_driver)
+            inicio = time.perf_counter()
+            try:
+                with self.metricas.medir('arranque.lanzar_chrome'):
+                    self.driver = webdriver.Chrome(service=Service(ruta_driver), options=options)
+            except Exception as e:
+                if self.actualizar_driver:
+                    raise
+                print(f"⚠️ El driver guardado no arrancó ({e.__class__.__name__}), resolviéndolo de nuevo...")
+                with self.metricas.medir('arranque.resolver_driver'):
+                    ruta_driver = self.resolver_chromedriver(True)
+                inicio = time.perf_counter()
+                with self.metricas.medir('arranque.lanzar_chrome'):
+                    self.driver = webdriver.Chrome(service=Service(ruta_driver), options=options)
             self.wait = WebDriverWait(self.driver, 30)
+            print(f"⏱️ Importación {TIEMPO_IMPORTACION:.2f} s, Chrome {time.perf_counter() - inicio:.2f} s")
 
             # Script anti-detección
             self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
 
+            if self.modo_liviano:
+                self.aplicar_modo_liviano()
+
             print("✅ Navegador configurado correctamente")
             return True
 
@@ -214,11 +1931,56 @@ class GestorComunidadesWhatsApp:
             print(f"❌ Error configurando navegador: {e}")
             return False
 
+    def aplicar_modo_liviano(self):
+        """Bloquear medios y animaciones con DevTools (se aplica antes de abrir WhatsApp)"""
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": URLS_MEDIOS_BLOQUEADOS})
+            self.driver.execute_cdp_cmd("Emulation.setEmulatedMedia", {
+                "features": [{"name": "prefers-reduced-motion", "value": "reduce"}]
+            })
+            self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": JS_SIN_ANIMACIONES})
+            print("🪶 Modo liviano: sin imágenes, medios, GPU ni animaciones")
+        except Exception as e:
+            print(f"⚠️ No se pudo aplicar todo el modo liviano: {e}")
+
+    def resolver_chromedriver(self, forzar=False):
+        """Ruta del chromedriver: la guardada en disco o, con forzar o sin una válida, la de webdriver-manager"""
+        if not forzar:
+            try:
+                with open(self.ruta_chromedriver, encoding='utf-8') as f:
+                    guardado = json.load(f)
+                if os.access(guardado['ruta'], os.X_OK):
+                    return guardado['ruta']
+            except (OSError, ValueError, KeyError):
+                pass
+
+        print("🔧 Resolviendo chromedriver (puede descargarlo)...")
+        from webdriver_manager.chrome import ChromeDriverManager
+        ruta = ChromeDriverManager().install()
+        try:
+            salida = subprocess.run([ruta, '--version'], capture_output=True, text=True, timeout=10).stdout
+            version = salida.strip().splitlines()[0] if salida.strip() else None
+        except Exception:
+            version = None
+
+        try:
+            temporal = f"{self.ruta_chromedriver}.{os.getpid()}.tmp"
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump({'ruta': ruta, 'version': version,
+                           'fecha': datetime.now().isoformat(timespec='seconds')}, f, indent=2)
+            os.replace(temporal, self.ruta_chromedriver)
+            print(f"✅ Chromedriver guardado: {version or ruta}")
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar la ruta del chromedriver: {e}")
+        return ruta
+
+    @medido('iniciar_whatsapp')
     def iniciar_whatsapp(self):
         """Iniciar WhatsApp Web"""
         try:
             print("\n📱 Abriendo WhatsApp Web...")
-            self.driver.get("https://web.whatsapp.com")
+            self.driver.get(self.url_whatsapp)
 
             if not self.usar_cache:
                 print("\n" + "="*60)
@@ -239,9 +2001,11 @@ class GestorComunidadesWhatsApp:
                 wait_largo = WebDriverWait(self.driver, 90)
 
                 # Esperar por el buscador de chats (indica que está logueado)
-                wait_largo.until(EC.presence_of_element_located((By.XPATH, "//div[@contenteditable='true'][@data-tab='3']")))
+                wait_largo.until(EC.presence_of_element_located((By.XPATH, self.XPATH_BUSCADOR_CHATS)))
                 print("✅ WhatsApp Web cargado exitosamente")
-                time.sleep(3)
+
+                # Esperar a que se pinte la lista de chats
+                self.esperar_alguno(["//div[@id='pane-side']"], timeout=15)
                 return True
             except Exception as e:
                 print("❌ No se pudo cargar WhatsApp Web")
@@ -253,12 +2017,192 @@ class GestorComunidadesWhatsApp:
             print(f"❌ Error iniciando WhatsApp: {e}")
             return False
 
-    def esperar_aleatorio(self, min_seg, max_seg):
-        """Esperar un tiempo aleatorio para simular comportamiento humano"""
-        tiempo = random.uniform(min_seg, max_seg)
-        print(f"⏳ Esperando {tiempo:.1f} segundos...")
-        time.sleep(tiempo)
+    def crear_ritmo(self):
+        """Controlador de ritmo de la cuenta de session_path (con su ritmo aprendido)"""
+        ritmo = ControladorRitmo(os.path.join(os.getcwd(), "ritmo.json"), os.path.basename(self.session_path))
+        ritmo.por_defecto(self.ritmo_inicial())
+        return ritmo
+
+    def ritmo_inicial(self):
+        """Acciones por minuto equivalentes al tiempo entre contactos configurado"""
+        promedio = (self.tiempo_min_contacto + self.tiempo_max_contacto) / 2
+        return 60 / promedio if promedio > 0 else float('inf')
+
+    @medido('espera_cuota')
+    def esperar_cupo(self, tipo, maximo=1):
+        """Esperar a que la cuota de la cuenta permita operar; devuelve cuántas operaciones caben"""
+        if not self.cuotas:
+            return maximo
+        return self.cuotas.esperar(tipo, maximo)
+
+    def anotar_cuota(self, tipo, cantidad):
+        if self.cuotas:
+            self.cuotas.registrar(tipo, cantidad)
+
+    @medido('pausa_ritmo')
+    def esperar_turno(self):
+        """Esperar el turno de la siguiente acción según el ritmo adaptativo"""
+        self.ritmo.esperar()
+
+    def anotar_ritmo(self, exito, inicio, limites_antes, tipo, cantidad=1):
+        """Informar al controlador de ritmo el resultado de una acción iniciada en inicio"""
+        limite = self.motivos_error.get('limite_frecuencia', 0) > limites_antes
+        self.ritmo.registrar(exito, time.perf_counter() - inicio, limite, tipo, cantidad)
+
+    @medido('pausa_paso')
+    def pausa_humana(self):
+        """Pausa corta después de un clic (política anti-detección)
+
+        Es independiente de las esperas de la interfaz: esas avanzan apenas
+        aparece el siguiente estado. Con pausa_max_paso=0 no se pausa.
+        """
+        if self.pausa_max_paso > 0:
+            time.sleep(random.uniform(self.pausa_min_paso, self.pausa_max_paso))
+
+    def esperar_condicion(self, condicion, timeout=60):
+        """Esperar hasta que condicion(driver) devuelva algo verdadero y devolverlo"""
+        return WebDriverWait(self.driver, timeout, poll_frequency=0.2).until(condicion)
+
+    def esperar_elemento(self, xpath, timeout=60, clickable=False):
+        """Esperar un elemento por XPath (presente o clickeable)"""
+        condicion = EC.element_to_be_clickable if clickable else EC.presence_of_element_located
+        return self.esperar_condicion(condicion((By.XPATH, xpath)), timeout)
+
+    def escanear_elementos(self, xpaths, contiene=None, solo_visibles=True, limite=0):
+        """Escanear candidatos de uno o varios XPaths con un solo execute_script
+
+        Devuelve una lista de diccionarios con 'elemento', 'origen' (índice del
+        XPath que lo encontró), 'titulos', 'role', 'aria_label', 'texto',
+        'visible' y 'habilitado'. Con contiene solo quedan los candidatos que
+        tienen ese texto en algún title. El costo no crece con la cantidad de
+        resultados porque todo se evalúa en el navegador.
+        """
+        if isinstance(xpaths, str):
+            xpaths = [xpaths]
+        try:
+            return self.driver.execute_script(
+                JS_ESCANEAR_ELEMENTOS, list(xpaths), contiene, solo_visibles, limite
+            ) or []
+        except StaleElementReferenceException:
+            return []
+
+    def esperar_alguno(self, xpaths, timeout=10):
+        """Esperar a que cualquiera de los XPaths tenga un elemento visible
+
+        Devuelve el primer elemento visible o None si se acaba el tiempo.
+        """
+        def alguno_visible(driver):
+            candidatos = self.escanear_elementos(xpaths, limite=1)
+            return candidatos[0]['elemento'] if candidatos else False
 
+        try:
+            return self.esperar_condicion(alguno_visible, timeout)
+        except TimeoutException:
+            return None
+
+    def _error_visible(self, motivos=None):
+        """Devolver ErrorWhatsApp si hay un estado de error conocido visible, si no None
+
+        Con motivos solo se buscan esos errores.
+        """
+        # Una sola consulta para todos los errores; 'origen' dice cuál apareció
+        motivos = list(motivos or self.ERRORES_CONOCIDOS)
+        candidatos = self.escanear_elementos([self.ERRORES_CONOCIDOS[motivo] for motivo in motivos], limite=1)
+        if not candidatos:
+            return None
+        return ErrorWhatsApp(motivos[candidatos[0]['origen']], candidatos[0]['texto'])
+
+    def _registrar_error(self, error):
+        """Contar un error conocido por motivo"""
+        self.ultimo_error = error
+        self.motivos_error[error.motivo] = self.motivos_error.get(error.motivo, 0) + 1
+
+    def esperar_exito_o_error(self, xpath, timeout=60, clickable=True):
+        """Esperar el elemento del siguiente paso o un error conocido, lo que ocurra primero
+
+        Si WhatsApp muestra un error conocido se lanza ErrorWhatsApp de
+        inmediato en lugar de agotar el timeout esperando el elemento.
+        """
+        condicion = EC.element_to_be_clickable if clickable else EC.presence_of_element_located
+        exito = condicion((By.XPATH, xpath))
+
+        def exito_o_error(driver):
+            # Primero el éxito: un aviso viejo no debe tumbar un paso que ya está listo
+            try:
+                elemento = exito(driver)
+            except (NoSuchElementException, StaleElementReferenceException):
+                elemento = False
+            if elemento:
+                return elemento
+
+            error = self._error_visible()
+            if error:
+                self._registrar_error(error)
+                raise error
+            return False
+
+        return self.esperar_condicion(exito_o_error, timeout)
+
+    def _estrategias(self, clave, **valores):
+        """Estrategias [(nombre, xpath), ...] de una clave en el orden aprendido"""
+        return [
+            (nombre, xpath.format(**valores) if valores else xpath)
+            for nombre, xpath in self.selectores.ordenar(clave, self.SELECTORES[clave])
+        ]
+
+    def xpath_selector(self, clave, **valores):
+        """XPath que une todas las estrategias de una clave (para esperar su ausencia)"""
+        return " | ".join(xpath for _, xpath in self._estrategias(clave, **valores))
+
+    def buscar_selector(self, clave, timeout=60, clickable=True, **valores):
+        """Buscar un elemento probando todas sus estrategias en una sola espera
+
+        En cada sondeo se prueban las estrategias en el orden aprendido y gana
+        la primera que encuentra el elemento, así un fallo de la primera ya no
+        cuesta un timeout completo. Las estrategias anteriores a la ganadora
+        cuentan como fallo. También falla de inmediato ante un error conocido.
+        """
+        estrategias = self._estrategias(clave, **valores)
+        inicio = time.time()
+
+        def alguna_estrategia(driver):
+            # Todas las estrategias en un solo viaje; gana la primera en el orden aprendido
+            for candidato in self.escanear_elementos([xpath for _, xpath in estrategias]):
+                if not clickable or candidato['habilitado']:
+                    return estrategias[candidato['origen']][0], candidato['elemento']
+
+            error = self._error_visible()
+            if error:
+                self._registrar_error(error)
+                raise error
+            return False
+
+        try:
+            ganadora, elemento = self.esperar_condicion(alguna_estrategia, timeout)
+        except TimeoutException:
+            for nombre, _ in estrategias:
+                self.selectores.registrar(clave, nombre, False)
+            raise
+
+        for nombre, _ in estrategias:
+            if nombre == ganadora:
+                break
+            self.selectores.registrar(clave, nombre, False)
+        self.selectores.registrar(clave, ganadora, True, time.time() - inicio)
+        print(f"  ✓ '{clave}' encontrado (estrategia: {ganadora})")
+        return elemento
+
+    def esperar_ausencia(self, xpath, timeout=10):
+        """Esperar a que no quede ningún elemento visible para el XPath"""
+        def ausente(driver):
+            return not self.escanear_elementos(xpath, limite=1)
+
+        try:
+            return self.esperar_condicion(ausente, timeout)
+        except TimeoutException:
+            return False
+
+    @medido('cerrar_modales')
     def _cerrar_ventanas_modales(self):
         """Cerrar todas las ventanas modales y volver a la vista principal de chat"""
         try:
@@ -268,105 +2212,198 @@ class GestorComunidadesWhatsApp:
             for i in range(3):
                 try:
                     ActionChains(self.driver).send_keys(Keys.ESCAPE).perform()
-                    time.sleep(0.5)
+                    self.esperar_ausencia(self.XPATH_DIALOGO, timeout=1)
                 except:
                     pass
 
-            # Verificar si hay botones de cerrar (X) visibles
+            # Verificar si hay botones de cerrar (X) visibles (un solo escaneo)
             try:
-                botones_cerrar = self.driver.find_elements(
-                    By.XPATH,
+                botones_cerrar = self.escanear_elementos(
                     "//button[@aria-label='Cerrar' or @aria-label='Close' or contains(@aria-label, 'cerrar')]"
                 )
                 for boton in botones_cerrar:
                     try:
-                        if boton.is_displayed():
-                            boton.click()
-                            time.sleep(0.5)
+                        boton['elemento'].click()
                     except:
                         pass
             except:
                 pass
 
+            # Listo cuando vuelve a estar el buscador de chats
+            self.esperar_alguno([self.XPATH_BUSCADOR_CHATS], timeout=5)
             print("  ✓ Ventanas modales cerradas")
-            time.sleep(1)
             return True
 
         except Exception as e:
             print(f"  ⚠️ Error cerrando ventanas: {e}")
             return False
 
+    def _abrir_detalles_perfil(self):
+        """Clic en 'Detalles del perfil' del chat abierto y esperar el panel de info"""
+        try:
+            with self.metricas.medir('abrir_detalles'):
+                print(f"   🔍 Abriendo detalles del perfil...")
+
+                # Buscar el botón "Detalles del perfil" con el selector exacto
+                boton_detalles = self.wait.until(EC.element_to_be_clickable(
+                    (By.XPATH, "//div[@title='Detalles del perfil'][@role='button']")
+                ))
+                boton_detalles.click()
+                print(f"   ✓ Clic en 'Detalles del perfil' exitoso")
+
+                # Listo cuando aparece el panel de info de la comunidad
+                self.esperar_elemento(self.XPATH_PANEL_INFO, timeout=30)
+                self.pausa_humana()
+            return True
+        except Exception as e:
+            print(f"   ⚠️ Error abriendo detalles del perfil: {e}")
+            return False
+
+    @medido('abrir_directo')
+    def abrir_comunidad_directa(self, nombre_comunidad):
+        """Abrir una comunidad conocida sin usar el buscador
+
+        Usa el título guardado la última vez que se abrió: si ese chat ya está
+        abierto solo se abren los detalles; si su fila está en la lista de
+        chats se abre con un clic. Devuelve False si hay que buscarla.
+        """
+        conocido = self.indice_comunidades.resultado(nombre_comunidad)
+        if not conocido:
+            return False
+        titulo = conocido[0]
+
+        try:
+            abierto = [c for c in self.escanear_elementos(
+                "//header[@data-testid='conversation-header']", contiene=titulo
+            ) if titulo in c['titulos']]
+            if abierto and self.driver.find_elements(By.XPATH, "//div[@title='Detalles del perfil'][@role='button']"):
+                print(f"   ⚡ El chat de '{titulo}' ya está abierto")
+                return self._abrir_detalles_perfil()
+
+            filas = [c for c in self.escanear_elementos(
+                "//div[@id='pane-side']//div[@role='listitem'] | //div[@id='pane-side']//div[@role='row']",
+                contiene=titulo,
+            ) if titulo in c['titulos']]
+            if not filas:
+                return False
+            print(f"   ⚡ Abriendo '{titulo}' directo desde la lista de chats")
+            if not self._abrir_resultado(filas[0]['elemento']):
+                return False
+            print(f"✅ Comunidad '{nombre_comunidad}' abierta")
+            return self._abrir_detalles_perfil()
+        except Exception as e:
+            print(f"   ℹ️ No se pudo abrir directo: {e}")
+            return False
+
+    def escribir_texto(self, campo, texto):
+        """Reemplazar el contenido de un campo editable con el texto completo
+
+        Usa un evento de edición de JavaScript, así el texto entra de una vez
+        y con emojis. Si el campo no quedó con el texto, se escribe con el
+        teclado sin los caracteres fuera del BMP y se devuelve False.
+        """
+        try:
+            escrito = self.driver.execute_script(JS_ESCRIBIR_TEXTO, campo, texto)
+            if (escrito or '').strip() == texto.strip():
+                return True
+        except Exception as e:
+            print(f"   ℹ️ No se pudo escribir con JavaScript: {e}")
+
+        self.metricas.reintento('escribir_texto')
+        campo.send_keys(Keys.CONTROL + "a")
+        campo.send_keys(Keys.DELETE)
+        if texto:
+            campo.send_keys(self.limpiar_texto_para_selenium(texto))
+        return False
+
+    @medido('buscar_comunidad')
     def buscar_comunidad(self, nombre_comunidad):
         """Buscar y abrir una comunidad"""
         try:
             print(f"\n🔍 Buscando comunidad: {nombre_comunidad}")
+            self.comunidad_actual = nombre_comunidad
+
+            # Una comunidad ya abierta antes se abre sin pasar por el buscador
+            if self.abrir_comunidad_directa(nombre_comunidad):
+                return True
 
-            # Extraer emoji de color si existe
-            emoji_color = self.extraer_emoji_color(nombre_comunidad)
+            # Clave precalculada: emoji de color, nombre sin emojis y nombres que chocan
+            clave = self.indice_comunidades.clave(nombre_comunidad)
+            emoji_color = clave.color
             if emoji_color:
                 print(f"   ℹ️ Emoji de color detectado: {emoji_color}")
-
-            # Limpiar el nombre para búsqueda (sin emojis porque ChromeDriver no los soporta)
-            nombre_busqueda = self.limpiar_texto_para_selenium(nombre_comunidad)
-            print(f"   ℹ️ Buscando con texto limpio: {nombre_busqueda}")
+            ambigua = len(clave.grupo) > 1
+            if ambigua:
+                print(f"   ℹ️ Hay {len(clave.grupo)} comunidades con el mismo nombre sin emoji: se exige el título exacto")
 
             # Hacer clic en el buscador
             wait_largo = WebDriverWait(self.driver, 60)
             buscador = wait_largo.until(EC.presence_of_element_located(
-                (By.XPATH, "//div[@contenteditable='true'][@data-tab='3']")
+                (By.XPATH, self.XPATH_BUSCADOR_CHATS)
             ))
             buscador.click()
-            time.sleep(1)
-
-            # Limpiar completamente el buscador
-            buscador.clear()
-            time.sleep(0.5)
-
-            buscador.send_keys(Keys.CONTROL + "a")
-            time.sleep(0.3)
-            buscador.send_keys(Keys.DELETE)
-            time.sleep(0.5)
-
-            print(f"   ✓ Buscador limpiado")
 
-            # Escribir el nombre SIN emoji
-            buscador.send_keys(nombre_busqueda)
+            # Escribir el nombre completo, con emoji, en un solo evento. Si no
+            # se pudo, queda escrito sin emojis (ChromeDriver no los teclea) y
+            # el emoji de color se busca entre los resultados
+            nombre_exacto = self.escribir_texto(buscador, nombre_comunidad)
+            nombre_busqueda = nombre_comunidad if nombre_exacto else clave.busqueda
             print(f"   ✓ Buscando: {nombre_busqueda}")
-            self.esperar_aleatorio(2, 3)
+
+            # Esperar a que se pinten los resultados (o el aviso de sin resultados)
+            self.esperar_alguno([
+                f"//div[@id='pane-side']//span[contains(@title, {literal_xpath(nombre_busqueda)})]",
+                self.XPATH_SIN_RESULTADOS,
+            ], timeout=10)
+            self.pausa_humana()
 
             # Buscar el resultado y hacer clic
             try:
                 resultado = None
+                filas = "//div[@id='pane-side']//div[@role='listitem'] | //div[@id='pane-side']//div[@role='row']"
 
-                # Si tiene emoji de color, buscar entre múltiples resultados
-                if emoji_color:
-                    print(f"   🔍 Buscando resultados que contengan '{emoji_color}' en el título...")
+                # Si ya se abrió antes, ir directo al resultado conocido: primero
+                # en la misma posición y si no en cualquier fila con ese título
+                conocido = self.indice_comunidades.resultado(nombre_comunidad)
+                if conocido:
+                    titulo, posicion = conocido
                     try:
-                        # Obtener TODOS los resultados de búsqueda
-                        time.sleep(1)  # Dar tiempo a que carguen los resultados
+                        for xpath in (f"({filas})[{posicion + 1}]", filas):
+                            coincidencias = [c for c in self.escanear_elementos(xpath, contiene=titulo)
+                                             if titulo in c['titulos']]
+                            if coincidencias:
+                                print(f"   ✓ Resultado conocido: {titulo}")
+                                resultado = coincidencias[0]['elemento']
+                                break
+                    except Exception as e:
+                        print(f"   ℹ️ Error buscando el resultado conocido: {e}")
 
-                        resultados = self.driver.find_elements(
-                            By.XPATH,
-                            "//div[@id='pane-side']//div[@role='listitem'] | //div[@id='pane-side']//div[@role='row']"
+                # Con el nombre completo escrito, el resultado es el de título exacto
+                if not resultado and nombre_exacto:
+                    try:
+                        exactos = self.escanear_elementos(
+                            f"//div[@id='pane-side']//span[@title={literal_xpath(nombre_comunidad)}]"
+                            "/ancestor::div[@role='listitem' or @role='row'][1]",
+                            limite=1,
                         )
+                        if exactos:
+                            print(f"   ✓ Resultado encontrado por nombre exacto")
+                            resultado = exactos[0]['elemento']
+                    except Exception as e:
+                        print(f"   ℹ️ Error buscando por nombre exacto: {e}")
 
-                        print(f"   ℹ️ Se encontraron {len(resultados)} resultados")
-
-                        # Buscar el que tenga el emoji correcto en el título
-                        for idx, res in enumerate(resultados):
-                            try:
-                                # Buscar el span con el título dentro de este resultado
-                                spans = res.find_elements(By.XPATH, ".//span[@title]")
-                                for span in spans:
-                                    titulo = span.get_attribute('title')
-                                    if titulo and emoji_color in titulo:
-                                        print(f"   ✓ Resultado encontrado con emoji {emoji_color}: {titulo}")
-                                        resultado = res
-                                        break
-                                if resultado:
-                                    break
-                            except:
-                                continue
+                # Si tiene emoji de color, buscar entre múltiples resultados
+                if not resultado and emoji_color:
+                    print(f"   🔍 Buscando resultados que contengan '{emoji_color}' en el título...")
+                    try:
+                        # Revisar TODOS los resultados de búsqueda en el navegador (un solo viaje)
+                        coincidencias = self.escanear_elementos(filas, contiene=emoji_color, limite=1)
+
+                        # El primero que tenga el emoji correcto en el título
+                        if coincidencias:
+                            titulo = next(t for t in coincidencias[0]['titulos'] if t and emoji_color in t)
+                            print(f"   ✓ Resultado encontrado con emoji {emoji_color}: {titulo}")
+                            resultado = coincidencias[0]['elemento']
 
                         if not resultado:
                             print(f"   ⚠️ No se encontró resultado con emoji {emoji_color}")
@@ -376,10 +2413,12 @@ class GestorComunidadesWhatsApp:
 
                 # Si no tiene emoji o no se encontró por emoji, buscar por título
                 if not resultado:
+                    if emoji_color:
+                        self.metricas.reintento('buscar_comunidad')
                     try:
                         # Buscar span que contenga el nombre limpio
                         span_resultado = wait_largo.until(EC.presence_of_element_located(
-                            (By.XPATH, f"//span[contains(@title, '{nombre_busqueda}')]")
+                            (By.XPATH, f"//span[contains(@title, {literal_xpath(nombre_busqueda)})]")
                         ))
                         resultado = span_resultado.find_element(By.XPATH, "./ancestor::div[@role='listitem' or @role='row'][1]")
                         print(f"   ✓ Resultado encontrado por texto")
@@ -387,8 +2426,10 @@ class GestorComunidadesWhatsApp:
                         print(f"   ℹ️ Búsqueda por texto falló: {e2}")
                         pass
 
-                # Último intento: primer resultado (solo si NO hay emoji de color)
-                if not resultado and not emoji_color:
+                # Último intento: primer resultado (solo si NO hay emoji de color
+                # ni otra comunidad con el mismo nombre)
+                if not resultado and not emoji_color and not ambigua:
+                    self.metricas.reintento('buscar_comunidad')
                     try:
                         resultado = wait_largo.until(EC.presence_of_element_located(
                             (By.XPATH, "//div[@id='pane-side']//div[@role='listitem'][1] | //div[@id='pane-side']//div[@role='row'][1]")
@@ -398,119 +2439,65 @@ class GestorComunidadesWhatsApp:
                         print(f"   ℹ️ Intento primer resultado falló: {e3}")
                         pass
 
-                # Intento 3: Presionar Enter en el buscador
-                if not resultado:
+                # Intento 3: Presionar Enter en el buscador (abre el primer resultado,
+                # así que no sirve si otra comunidad tiene el mismo nombre sin emoji)
+                if not resultado and not ambigua:
+                    self.metricas.reintento('buscar_comunidad')
                     try:
                         print(f"   ℹ️ Intentando con Enter...")
                         buscador.send_keys(Keys.ENTER)
-                        time.sleep(2)
                         print(f"   ✓ Enter presionado")
-                        # Verificar si se abrió el chat
+                        # Verificar que se abrió el chat de esta comunidad y no otro
+                        def chat_abierto(driver):
+                            encabezados = self.escanear_elementos(
+                                "//header[@data-testid='conversation-header']", contiene=nombre_comunidad
+                            )
+                            return any(nombre_comunidad in c['titulos'] for c in encabezados)
+
                         try:
-                            self.driver.find_element(By.XPATH, "//header[@data-testid='conversation-header']")
+                            self.esperar_condicion(chat_abierto, timeout=3)
                             print(f"✅ Comunidad '{nombre_comunidad}' abierta (método Enter)")
-                            self.esperar_aleatorio(2, 3)
-                            return True
-                        except:
-                            print(f"   ⚠️ Enter no abrió el chat")
+                            self.pausa_humana()
+                            return self._abrir_detalles_perfil()
+                        except TimeoutException:
                             pass
+                        print(f"   ⚠️ Enter no abrió el chat de '{nombre_comunidad}'")
                     except Exception as e3:
                         print(f"   ℹ️ Intento 3 falló: {e3}")
                         pass
 
                 if resultado:
-                    # Intentar hacer clic - Múltiples métodos
-                    clic_exitoso = False
-
-                    # Método 1: Doble clic (más confiable en WhatsApp)
                     try:
-                        ActionChains(self.driver).double_click(resultado).perform()
-                        print(f"   ✓ Doble clic en resultado")
-                        time.sleep(3)
+                        posicion, titulo = self.driver.execute_script(JS_POSICION_RESULTADO, resultado)
+                    except Exception:
+                        posicion, titulo = -1, None
 
-                        # Verificar si se abrió - buscar header o contenido de chat
-                        try:
-                            # Verificar si existe header de conversación
-                            self.driver.find_element(By.XPATH, "//header[@data-testid='conversation-header']")
-                            clic_exitoso = True
-                        except:
-                            # Si no, verificar si hay contenido de chat visible (área de mensajes)
-                            try:
-                                self.driver.find_element(By.XPATH, "//div[@data-testid='conversation-panel-body'] | //div[contains(@class, 'copyable-area')]")
-                                clic_exitoso = True
-                            except:
-                                pass
-                    except Exception as e:
-                        print(f"   ℹ️ Doble clic falló: {e}")
-
-                    # Método 2: Clic simple si el doble clic no funcionó
-                    if not clic_exitoso:
-                        try:
-                            resultado.click()
-                            print(f"   ✓ Clic simple en resultado")
-                            time.sleep(3)
-
-                            # Verificar si se abrió
-                            try:
-                                self.driver.find_element(By.XPATH, "//header[@data-testid='conversation-header']")
-                                clic_exitoso = True
-                            except:
-                                try:
-                                    self.driver.find_element(By.XPATH, "//div[@data-testid='conversation-panel-body'] | //div[contains(@class, 'copyable-area')]")
-                                    clic_exitoso = True
-                                except:
-                                    pass
-                        except Exception as e:
-                            print(f"   ℹ️ Clic simple falló: {e}")
-
-                    # Método 3: JavaScript click
-                    if not clic_exitoso:
-                        try:
-                            self.driver.execute_script("arguments[0].click();", resultado)
-                            print(f"   ✓ Clic con JavaScript")
-                            time.sleep(3)
-
-                            # Verificar si se abrió
-                            try:
-                                self.driver.find_element(By.XPATH, "//header[@data-testid='conversation-header']")
-                                clic_exitoso = True
-                            except:
-                                try:
-                                    self.driver.find_element(By.XPATH, "//div[@data-testid='conversation-panel-body'] | //div[contains(@class, 'copyable-area')]")
-                                    clic_exitoso = True
-                                except:
-                                    pass
-                        except Exception as e:
-                            print(f"   ℹ️ Clic JavaScript falló: {e}")
+                    # Intentar hacer clic - Múltiples métodos, primero el que mejor ha funcionado
+                    clic_exitoso = self._abrir_resultado(resultado)
 
                     # Verificar resultado final
                     if clic_exitoso:
                         print(f"✅ Comunidad '{nombre_comunidad}' abierta")
+                        if titulo and posicion >= 0:
+                            self.indice_comunidades.guardar_resultado(nombre_comunidad, titulo, posicion)
 
-                        # IMPORTANTE: Hacer clic en "Detalles del perfil" para abrir el panel de info
+                        # Dejar la lista de chats sin filtro: la próxima vez la
+                        # comunidad se puede abrir directo desde ahí
                         try:
-                            time.sleep(3)
-                            print(f"   🔍 Abriendo detalles del perfil...")
-
-                            # Buscar el botón "Detalles del perfil" con el selector exacto
-                            boton_detalles = self.wait.until(EC.element_to_be_clickable(
-                                (By.XPATH, "//div[@title='Detalles del perfil'][@role='button']")
-                            ))
-                            boton_detalles.click()
-                            print(f"   ✓ Clic en 'Detalles del perfil' exitoso")
-                            self.esperar_aleatorio(2, 3)
-                        except Exception as e:
-                            print(f"   ⚠️ Error abriendo detalles del perfil: {e}")
-                            return False
-
-                        self.esperar_aleatorio(2, 3)
-                        return True
+                            self.escribir_texto(buscador, '')
+                        except Exception:
+                            pass
+
+                        # IMPORTANTE: Hacer clic en "Detalles del perfil" para abrir el panel de info
+                        return self._abrir_detalles_perfil()
                     else:
-                        print(f"   ⚠️ El chat no se abrió después de 4 intentos")
+                        print(f"   ⚠️ El chat no se abrió con ningún método de clic")
                         return False
                 else:
                     print(f"❌ No se encontró la comunidad '{nombre_comunidad}'")
                     print(f"   💡 Verifica que existe con ese nombre en WhatsApp")
+                    # El acceso guardado ya no sirve
+                    self.indice_comunidades.olvidar_resultado(nombre_comunidad)
                     return False
 
             except Exception as e:
@@ -521,6 +2508,35 @@ class GestorComunidadesWhatsApp:
             print(f"❌ Error buscando comunidad: {e}")
             return False
 
+    @medido('abrir_resultado')
+    def _abrir_resultado(self, resultado):
+        """Abrir un resultado de la lista de chats probando los métodos de clic en el orden aprendido"""
+        for intento, (metodo, descripcion) in enumerate(self.selectores.ordenar('abrir_resultado', self.CLICS_RESULTADO)):
+            if intento:
+                self.metricas.reintento('abrir_resultado')
+            inicio = time.time()
+            try:
+                if metodo == 'doble_clic':
+                    ActionChains(self.driver).double_click(resultado).perform()
+                elif metodo == 'clic_simple':
+                    resultado.click()
+                else:
+                    self.driver.execute_script("arguments[0].click();", resultado)
+                print(f"   ✓ {descripcion} en resultado")
+
+                # Verificar si se abrió - header o contenido de chat (área de mensajes)
+                abierto = self.esperar_alguno([self.XPATH_CHAT_ABIERTO], timeout=3) is not None
+            except Exception as e:
+                print(f"   ℹ️ {descripcion} falló: {e}")
+                abierto = False
+
+            self.selectores.registrar('abrir_resultado', metodo, abierto, time.time() - inicio)
+            if abierto:
+                return True
+
+        return False
+
+    @medido('abrir_detalles')
     def abrir_info_comunidad(self):
         """Abrir información de la comunidad"""
         try:
@@ -529,117 +2545,152 @@ class GestorComunidadesWhatsApp:
                 (By.XPATH, "//header[@data-testid='conversation-header']")
             ))
             header.click()
-            self.esperar_aleatorio(2, 3)
+            self.esperar_elemento(self.XPATH_PANEL_INFO, timeout=30)
+            self.pausa_humana()
             return True
         except Exception as e:
             print(f"❌ Error abriendo info de comunidad: {e}")
             return False
 
-    def agregar_participante(self, celular):
-        """Agregar un participante a la comunidad - PASOS EXACTOS"""
+    def _abrir_dialogo_anadir(self):
+        """PASOS 1-2: abrir el tab de la comunidad y el diálogo 'Añadir miembros'"""
+        # PASO 1: Clic en la comunidad (tab de la comunidad en el panel de info)
+        # Selector: div[@role='button'][@data-tab='6'] que contiene el nombre de la comunidad
         try:
-            # Convertir celular a string y limpiar el .0 si viene de Excel
-            celular = str(int(float(celular)))
-            print(f"\n➕ Agregando: {celular}")
-
-            # PASO 1: Clic en la comunidad (tab de la comunidad en el panel de info)
-            # Selector: div[@role='button'][@data-tab='6'] que contiene el nombre de la comunidad
-            try:
+            with self.metricas.medir('agregar.paso1_tab_comunidad'):
                 print("  PASO 1: Buscando tab de la comunidad...")
 
-                # Esperar con timeout extendido para conexiones lentas
-                wait_largo = WebDriverWait(self.driver, 60)
-                tab_comunidad = wait_largo.until(EC.element_to_be_clickable(
-                    (By.XPATH, "//div[@role='button'][@data-tab='6']")
-                ))
+                # Esperar con timeout extendido para conexiones lentas (o fallar apenas aparezca un error conocido)
+                tab_comunidad = self.esperar_exito_o_error("//div[@role='button'][@data-tab='6']")
                 tab_comunidad.click()
                 print("  ✓ Clic en tab de comunidad exitoso")
-                self.esperar_aleatorio(2, 3)
-            except Exception as e:
-                print(f"  ⚠️ Error en PASO 1 (clic en tab comunidad): {e}")
-                return False
+                self.pausa_humana()
+        except Exception as e:
+            print(f"  ⚠️ Error en PASO 1 (clic en tab comunidad): {e}")
+            return False
 
-            # PASO 2: Clic en "Añadir miembros"
-            # Selector: button[@aria-label='Añadir miembros'] con icono person-add-filled-refreshed
-            try:
+        # PASO 2: Clic en "Añadir miembros"
+        # Selector: button[@aria-label='Añadir miembros'] con icono person-add-filled-refreshed
+        try:
+            with self.metricas.medir('agregar.paso2_boton_anadir'):
                 print("  PASO 2: Buscando botón 'Añadir miembros'...")
 
-                # Esperar con timeout extendido
-                wait_largo = WebDriverWait(self.driver, 60)
-                boton_anadir = wait_largo.until(EC.element_to_be_clickable(
-                    (By.XPATH, "//button[@aria-label='Añadir miembros']")
-                ))
+                # Esperar con timeout extendido (o fallar apenas aparezca un error conocido)
+                boton_anadir = self.esperar_exito_o_error("//button[@aria-label='Añadir miembros']")
                 boton_anadir.click()
                 print("  ✓ Clic en 'Añadir miembros' exitoso")
-                self.esperar_aleatorio(2, 3)
-            except Exception as e:
-                print(f"  ⚠️ Error en PASO 2 (botón añadir miembros): {e}")
-                return False
+                self.pausa_humana()
+        except Exception as e:
+            print(f"  ⚠️ Error en PASO 2 (botón añadir miembros): {e}")
+            return False
 
-            # PASO 3: Buscar el contacto en el campo de búsqueda
-            # Selector: div[@contenteditable='true'][@data-tab='3'] con aria-label="Buscar un nombre o número"
-            try:
+        return True
+
+    def _seleccionar_contacto_anadir(self, celular):
+        """PASOS 3-4: buscar un número en el diálogo 'Añadir miembros' y seleccionarlo"""
+        # PASO 3: Buscar el contacto en el campo de búsqueda
+        # Selector: div[@contenteditable='true'][@data-tab='3'] con aria-label="Buscar un nombre o número"
+        try:
+            with self.metricas.medir('agregar.paso3_escribir_numero'):
                 print("  PASO 3: Escribiendo número en campo de búsqueda...")
 
-                # Esperar con timeout extendido
-                wait_largo = WebDriverWait(self.driver, 60)
-                campo_busqueda = wait_largo.until(EC.presence_of_element_located(
-                    (By.XPATH, "//div[@contenteditable='true'][@data-tab='3'][@aria-label='Buscar un nombre o número']")
-                ))
+                # Esperar con timeout extendido (o fallar apenas aparezca un error conocido)
+                campo_busqueda = self.esperar_exito_o_error(
+                    "//div[@contenteditable='true'][@data-tab='3'][@aria-label='Buscar un nombre o número']",
+                    clickable=False
+                )
                 campo_busqueda.click()
-                time.sleep(0.5)
 
-                # Limpiar campo
-                campo_busqueda.send_keys(Keys.CONTROL + "a")
-                campo_busqueda.send_keys(Keys.DELETE)
-                time.sleep(0.5)
+                # Primera fila antes de filtrar: si cambia, la lista ya se filtró
+                xpath_fila = f"{self.XPATH_DIALOGO}//*[@role='listitem' or @role='row']"
+                filas = self.escanear_elementos(xpath_fila, limite=1)
+                primera = filas[0]['elemento'] if filas else None
 
-                # Escribir el número con prefijo +57
-                celular_completo = f"+57{celular}"
-                campo_busqueda.send_keys(celular_completo)
+                # Escribir el número en formato E.164 (reemplaza lo que hubiera en el campo)
+                celular_completo = celular
+                self.escribir_texto(campo_busqueda, celular_completo)
                 print(f"  ✓ Escrito: {celular_completo}")
-                time.sleep(2)
-            except Exception as e:
-                print(f"  ⚠️ Error en PASO 3 (escribir número): {e}")
-                return False
 
-            # PASO 4: Presionar Enter para buscar
+                # Esperar el resultado con ese número, el aviso de sin resultados o
+                # cualquier otra fila filtrada (un contacto guardado con nombre)
+                def lista_filtrada(driver):
+                    if self.escanear_elementos([
+                        f"//span[@title][contains(translate(@title, ' +-()', ''), '{celular.lstrip('+')}')]",
+                        self.XPATH_SIN_RESULTADOS,
+                    ], limite=1):
+                        return True
+                    filas = self.escanear_elementos(xpath_fila, limite=1)
+                    return bool(filas) and filas[0]['elemento'] != primera
+
+                try:
+                    self.esperar_condicion(lista_filtrada, timeout=3)
+                except TimeoutException:
+                    pass
+        except Exception as e:
+            print(f"  ⚠️ Error en PASO 3 (escribir número): {e}")
+            return False
+
+        # Si WhatsApp no encuentra el número no hay nada que seleccionar
+        if self.driver.find_elements(By.XPATH, self.XPATH_SIN_RESULTADOS):
+            print(f"  ⚠️ No se encontró el contacto {celular_completo}")
+            self._registrar_error(ErrorWhatsApp('sin_resultados', celular_completo))
+
+            # Limpiar el campo para que el aviso no quede en el diálogo
             try:
+                self.escribir_texto(campo_busqueda, '')
+            except:
+                pass
+            return False
+
+        # PASO 4: Presionar Enter para seleccionar
+        try:
+            with self.metricas.medir('agregar.paso4_seleccionar'):
                 print("  PASO 4: Presionando Enter...")
                 campo_busqueda.send_keys(Keys.ENTER)
                 print("  ✓ Enter presionado")
-                self.esperar_aleatorio(3, 4)
-            except Exception as e:
-                print(f"  ⚠️ Error en PASO 4 (Enter): {e}")
-                return False
+                self.pausa_humana()
+        except Exception as e:
+            print(f"  ⚠️ Error en PASO 4 (Enter): {e}")
+            return False
 
-            # PASO 5: Clic en el botón de confirmar (checkmark)
-            # Selector: div[@role='button'] con span[@data-icon='checkmark-medium']
-            try:
+        return True
+
+    def _confirmar_anadir(self, celulares):
+        """PASOS 5-6: confirmar los contactos seleccionados en el diálogo 'Añadir miembros'
+
+        Devuelve {celular: True/False}. Si después de confirmar WhatsApp
+        muestra un error, fallan los números que nombra el diálogo (o todos
+        si no nombra ninguno).
+        """
+        fallo_total = {celular: False for celular in celulares}
+
+        # PASO 5: Clic en el botón de confirmar (checkmark)
+        # Selector: div[@role='button'] con span[@data-icon='checkmark-medium']
+        try:
+            with self.metricas.medir('agregar.paso5_confirmar'):
                 print("  PASO 5: Buscando botón de confirmar (checkmark)...")
 
-                # Esperar con timeout extendido
-                wait_largo = WebDriverWait(self.driver, 60)
-                boton_checkmark = wait_largo.until(EC.element_to_be_clickable(
-                    (By.XPATH, "//span[@data-icon='checkmark-medium']/ancestor::div[@role='button'][1]")
-                ))
+                # Esperar con timeout extendido (o fallar apenas aparezca un error conocido)
+                boton_checkmark = self.esperar_exito_o_error(
+                    "//span[@data-icon='checkmark-medium']/ancestor::div[@role='button'][1]"
+                )
                 boton_checkmark.click()
                 print("  ✓ Clic en checkmark exitoso")
-                self.esperar_aleatorio(2, 3)
-            except Exception as e:
-                print(f"  ⚠️ Error en PASO 5 (checkmark): {e}")
-                return False
+                self.pausa_humana()
+        except Exception as e:
+            print(f"  ⚠️ Error en PASO 5 (checkmark): {e}")
+            return fallo_total
 
-            # PASO 6: Clic en "Añadir miembro" final
-            # Selector: div[@role='button'] que contiene span con texto "Añadir miembro"
-            try:
+        # PASO 6: Clic en "Añadir miembro" final
+        # Selector: div[@role='button'] que contiene span con texto "Añadir miembro"
+        # (con varios contactos el texto es "Añadir miembros")
+        try:
+            with self.metricas.medir('agregar.paso6_anadir_miembro'):
                 print("  PASO 6: Buscando botón final 'Añadir miembro'...")
 
-                # Esperar con timeout extendido
-                wait_largo = WebDriverWait(self.driver, 60)
-                boton_confirmar = wait_largo.until(EC.element_to_be_clickable(
-                    (By.XPATH, "//div[contains(@class, 'x1i10hfl') and contains(@class, 'x1qjc9v5')]//span[contains(text(), 'Añadir miembro')]")
-                ))
+                # Esperar con timeout extendido (o fallar apenas aparezca un error conocido)
+                xpath_confirmar = self.xpath_selector('confirmar_anadir')
+                boton_confirmar = self.buscar_selector('confirmar_anadir')
 
                 # Intentar clic normal, si falla usar JavaScript
                 try:
@@ -648,225 +2699,398 @@ class GestorComunidadesWhatsApp:
                     self.driver.execute_script("arguments[0].click();", boton_confirmar)
 
                 print("  ✓ Clic en 'Añadir miembro' final exitoso")
-                print(f"✅ Participante {celular} agregado exitosamente")
-                self.esperar_aleatorio(2, 3)
+        except Exception as e:
+            print(f"  ⚠️ Error en PASO 6 (botón final añadir): {e}")
+            return fallo_total
+
+        # Resultado: se cierra la confirmación o aparece un error conocido
+        inicio = time.perf_counter()
+        error = self._esperar_resultado_confirmacion(xpath_confirmar)
+        self.metricas.registrar('agregar.esperar_confirmacion', time.perf_counter() - inicio,
+                                error.motivo if error else None)
+        self.pausa_humana()
+        if not error:
+            return {celular: True for celular in celulares}
+
+        print(f"  ⚠️ WhatsApp rechazó la adición ({error.motivo}): {error.texto}")
+        # Solo el texto del aviso: el diálogo también muestra los contactos seleccionados
+        mencionados = celulares_en_texto(error.texto, self.prefijo_pais, self.longitud_celular)
+        fallidos = [celular for celular in celulares if celular in mencionados] or list(celulares)
+        return {celular: celular not in fallidos for celular in celulares}
+
+    def _esperar_resultado_confirmacion(self, xpath_confirmar, timeout=10):
+        """Esperar a que se cierre una confirmación; devolver ErrorWhatsApp si aparece un error
+
+        Si la confirmación no se cierra a tiempo devuelve ErrorWhatsApp('sin_confirmacion').
+        """
+        # Una lista vacía después de confirmar no es un rechazo
+        motivos = [motivo for motivo in self.ERRORES_CONOCIDOS if motivo != 'sin_resultados']
+
+        def cerrado_o_error(driver):
+            # Primero el éxito: la confirmación ya se cerró
+            if not driver.find_elements(By.XPATH, xpath_confirmar):
+                return True
+            return self._error_visible(motivos) or False
 
-                # Cerrar ventanas
-                try:
-                    ActionChains(self.driver).send_keys(Keys.ESCAPE).perform()
-                    time.sleep(1)
-                except:
-                    pass
+        try:
+            resultado = self.esperar_condicion(cerrado_o_error, timeout)
+        except TimeoutException:
+            # Sin cierre ni error no hay cómo saber si se aplicó: cuenta como fallo
+            # y la relectura de la lista de miembros en ejecutar_plan lo confirma
+            resultado = ErrorWhatsApp('sin_confirmacion', "La confirmación no se cerró")
+
+        if resultado is True:
+            # El aviso de error puede aparecer justo después de cerrarse la confirmación
+            if not self.esperar_alguno([self.ERRORES_CONOCIDOS[motivo] for motivo in motivos], timeout=1):
+                return None
+            resultado = self._error_visible(motivos)
+            if not resultado:
+                return None
+
+        self._registrar_error(resultado)
+        return resultado
+
+    @medido('agregar.cerrar_dialogo')
+    def _cerrar_dialogo_anadir(self):
+        """Cerrar el diálogo 'Añadir miembros'"""
+        try:
+            ActionChains(self.driver).send_keys(Keys.ESCAPE).perform()
+            self.esperar_ausencia(self.XPATH_DIALOGO, timeout=2)
+        except:
+            pass
 
-                return True
+    def agregar_participante(self, celular):
+        """Agregar un participante a la comunidad - PASOS EXACTOS"""
+        try:
+            # Convertir celular a E.164 (limpia el .0 si viene de Excel)
+            numero = self.normalizar_celular(celular)
+            if not numero:
+                print(f"⚠️ Número inválido: {celular}")
+                return False
+            celular = numero
+            print(f"\n➕ Agregando: {celular}")
 
-            except Exception as e:
-                print(f"  ⚠️ Error en PASO 6 (botón final añadir): {e}")
+            if not self._abrir_dialogo_anadir():
+                return False
 
-                # Intentar cerrar
-                try:
-                    ActionChains(self.driver).send_keys(Keys.ESCAPE).perform()
-                    time.sleep(1)
-                except:
-                    pass
+            if not self._seleccionar_contacto_anadir(celular):
+                self._cerrar_dialogo_anadir()
                 return False
 
+            exito = self._confirmar_anadir([celular])[celular]
+            if exito:
+                print(f"✅ Participante {celular} agregado exitosamente")
+
+            # Cerrar ventanas
+            self._cerrar_dialogo_anadir()
+            return exito
+
         except Exception as e:
             print(f"❌ Error general agregando {celular}: {e}")
             return False
 
-    def eliminar_participante(self, celular):
-        """Eliminar un participante de la comunidad - PASOS EXACTOS ACTUALIZADOS"""
-        try:
-            # Convertir celular a string y limpiar el .0 si viene de Excel
-            celular = str(int(float(celular)))
-            print(f"\n➖ Eliminando: {celular}")
+    def agregar_participantes(self, celulares, max_por_lote=None):
+        """Agregar varios participantes seleccionándolos en un solo diálogo
+
+        Abre 'Añadir miembros' una vez por lote de hasta max_por_lote números,
+        selecciona cada uno y confirma una sola vez. Devuelve un diccionario
+        {celular: True/False} con el resultado de cada número.
+        """
+        if max_por_lote is None:
+            max_por_lote = self.max_por_lote
+        max_por_lote = max(1, int(max_por_lote))
+
+        resultados = {}
+        celulares = list(celulares)
+
+        desde = 0
+        while desde < len(celulares):
+            # El lote se achica si la cuota de la hora o del día no alcanza
+            tamano = self.esperar_cupo('agregar', min(max_por_lote, len(celulares) - desde))
+            lote = celulares[desde:desde + tamano]
+            inicio, desde = desde, desde + len(lote)
+            print(f"\n➕ Agregando lote de {len(lote)} números ({inicio + 1}-{inicio + len(lote)} de {len(celulares)})")
+
+            # Entre lotes hay que volver al panel de detalles de la comunidad
+            if inicio > 0 and not self._volver_a_detalles_comunidad(self.comunidad_actual):
+                for celular in celulares[inicio:]:
+                    resultados[celular] = False
+                break
+
+            # Cada lote es una acción: esperar el turno que marca el ritmo
+            self.esperar_turno()
+            inicio_accion = time.perf_counter()
+            limites_antes = self.motivos_error.get('limite_frecuencia', 0)
+            try:
+                if not self._abrir_dialogo_anadir():
+                    for celular in lote:
+                        resultados[celular] = False
+                    self.anotar_ritmo(False, inicio_accion, limites_antes, 'agregar', len(lote))
+                    continue
+
+                seleccionados = {}
+                for celular in lote:
+                    numero = self.normalizar_celular(celular)
+                    if not numero:
+                        print(f"  ⚠️ Número inválido: {celular}")
+                        resultados[celular] = False
+                        continue
+
+                    if self._seleccionar_contacto_anadir(numero):
+                        seleccionados[numero] = celular
+                    else:
+                        resultados[celular] = False
 
-            time.sleep(2)
+                if not seleccionados:
+                    print("  ⚠️ Ningún número del lote se pudo seleccionar")
+                    self._cerrar_dialogo_anadir()
+                    self.anotar_ritmo(False, inicio_accion, limites_antes, 'agregar', len(lote))
+                    continue
 
-            # PASO 1: Clic en el tab "Comunidad"
-            # Selector: button[@role='tab'] con title="Comunidad"
-            try:
+                confirmados = self._confirmar_anadir(list(seleccionados))
+                self.anotar_cuota('agregar', len(seleccionados))
+                for numero, celular in seleccionados.items():
+                    resultados[celular] = confirmados[numero]
+
+                agregados = sum(1 for exito in confirmados.values() if exito)
+                if agregados:
+                    print(f"✅ {agregados} participantes agregados en un solo paso")
+                self._cerrar_dialogo_anadir()
+                self.anotar_ritmo(agregados > 0, inicio_accion, limites_antes, 'agregar', len(lote))
+
+            except Exception as e:
+                print(f"❌ Error general agregando lote: {e}")
+                for celular in lote:
+                    resultados.setdefault(celular, False)
+                self._cerrar_dialogo_anadir()
+                self.anotar_ritmo(False, inicio_accion, limites_antes, 'agregar', len(lote))
+
+        return resultados
+
+    @medido('eliminar.cerrar_dialogo')
+    def _cerrar_dialogo_eliminar(self, cerrar_ventanas):
+        """Cerrar todo o solo el diálogo actual después de eliminar"""
+        if cerrar_ventanas:
+            self._cerrar_ventanas_modales()
+            return
+
+        try:
+            ActionChains(self.driver).send_keys(Keys.ESCAPE).perform()
+            self.esperar_ausencia(self.XPATH_DIALOGO, timeout=2)
+        except:
+            pass
+
+    def _abrir_panel_miembros(self):
+        """PASOS 1-2: abrir el tab 'Comunidad' y el panel 'Buscar miembros'"""
+        # PASO 1: Clic en el tab "Comunidad"
+        # Selector: button[@role='tab'] con title="Comunidad"
+        try:
+            with self.metricas.medir('eliminar.paso1_tab_comunidad'):
                 print("  PASO 1: Haciendo clic en tab 'Comunidad'...")
 
-                # Esperar con timeout extendido para conexiones lentas
-                wait_largo = WebDriverWait(self.driver, 60)
-                tab_comunidad = wait_largo.until(EC.element_to_be_clickable(
-                    (By.XPATH, "//button[@role='tab' and @title='Comunidad']")
-                ))
+                # Esperar con timeout extendido para conexiones lentas (o fallar apenas aparezca un error conocido)
+                tab_comunidad = self.esperar_exito_o_error(
+                    "//button[@role='tab' and @title='Comunidad']"
+                )
                 tab_comunidad.click()
                 print("  ✓ Clic en tab 'Comunidad' exitoso")
                 print("  ⏳ Esperando que cargue la vista de comunidad...")
-                # Esperar más tiempo porque la vista de comunidad se demora en cargar
-                self.esperar_aleatorio(4, 6)
-            except Exception as e:
-                print(f"  ⚠️ Error en PASO 1 (tab comunidad): {e}")
-                return False
+                # La vista de comunidad se demora en cargar: esperar a que aparezca la lista de miembros
+                self.esperar_alguno([
+                    "//span[@data-icon='search']/ancestor::div[@role='button'][1]",
+                    "//span[contains(text(), 'miembros de la comunidad')]",
+                ], timeout=30)
+                self.pausa_humana()
+        except Exception as e:
+            print(f"  ⚠️ Error en PASO 1 (tab comunidad): {e}")
+            return False
 
-            # PASO 2: Clic en "X miembros de la comunidad" (el botón con ícono de búsqueda)
-            # Este es el div con role="button" que contiene el texto de miembros y el ícono search
-            try:
+        # PASO 2: Clic en "X miembros de la comunidad" (el botón con ícono de búsqueda)
+        # Este es el div con role="button" que contiene el texto de miembros y el ícono search
+        try:
+            with self.metricas.medir('eliminar.paso2_lista_miembros'):
                 print("  PASO 2: Haciendo clic en 'miembros de la comunidad'...")
 
-                # Esperar con timeout extendido
-                wait_largo = WebDriverWait(self.driver, 60)
+                # Botón con el ícono search o con el texto "miembros de la comunidad"
+                boton_miembros = self.buscar_selector('boton_miembros')
 
-                # Buscar el botón que contiene "miembros de la comunidad" y el ícono search
-                boton_miembros = None
+                # La cantidad del botón sirve para saber si la lista se leyó entera
+                textos = self.escanear_elementos("//span[contains(text(), 'miembros de la comunidad') or "
+                                                 "contains(text(), 'community members')]", limite=1)
+                cantidad = re.search(r'\d[\d.,]*', textos[0]['texto']) if textos else None
+                self.total_miembros = int(re.sub(r'\D', '', cantidad.group())) if cantidad else None
 
-                # Método 1: Por el ícono search dentro de un botón que tiene el texto "miembros"
-                try:
-                    boton_miembros = wait_largo.until(EC.element_to_be_clickable(
-                        (By.XPATH, "//div[@role='button' and contains(@class, 'x1ypdohk')]//span[@data-icon='search']/..")
-                    ))
-                    print("  ✓ Botón 'miembros' encontrado (método 1)")
-                except:
-                    pass
+                boton_miembros.click()
+                print("  ✓ Clic en 'miembros de la comunidad' exitoso")
+                self.esperar_alguno(["//div[@aria-label='Buscar miembros']"], timeout=30)
+                self.pausa_humana()
 
-                # Método 2: Por el div que contiene el span con "miembros de la comunidad"
-                if not boton_miembros:
-                    try:
-                        # Buscar el span que contiene "miembros de la comunidad" y obtener el div padre clickeable
-                        span_miembros = wait_largo.until(EC.presence_of_element_located(
-                            (By.XPATH, "//span[contains(text(), 'miembros de la comunidad')]")
-                        ))
-                        boton_miembros = span_miembros.find_element(By.XPATH, "./ancestor::div[@role='button'][1]")
-                        print("  ✓ Botón 'miembros' encontrado (método 2)")
-                    except:
-                        pass
+        except Exception as e:
+            print(f"  ⚠️ Error en PASO 2 (botón miembros): {e}")
+            return False
 
-                if boton_miembros:
-                    boton_miembros.click()
-                    print("  ✓ Clic en 'miembros de la comunidad' exitoso")
-                    self.esperar_aleatorio(2, 3)
-                else:
-                    print("  ⚠️ No se encontró el botón de miembros")
-                    return False
+        return True
 
-            except Exception as e:
-                print(f"  ⚠️ Error en PASO 2 (botón miembros): {e}")
-                return False
+    def _panel_miembros_abierto(self):
+        """Verificar si el campo 'Buscar miembros' sigue visible"""
+        try:
+            return bool(self.escanear_elementos("//div[@aria-label='Buscar miembros']", limite=1))
+        except:
+            return False
 
-            # PASO 3: Escribir el celular en el campo "Buscar miembros"
-            # Selector: div[@aria-label="Buscar miembros"][@contenteditable="true"]
-            try:
+    @medido('leer_miembros')
+    def leer_miembros_comunidad(self, comunidad):
+        """Recorrer una vez la lista de miembros y guardarla en el índice local
+
+        Debe estar abierto el panel de detalles de la comunidad. Devuelve
+        (miembros, completa) o None si la lista no se pudo leer.
+        """
+        print("  📇 Leyendo la lista de miembros de la comunidad...")
+        if not self._abrir_panel_miembros():
+            return None
+
+        # La lista carga después del campo de búsqueda: esperar al menos una fila
+        fila = f"{self.XPATH_DIALOGO}//*[@role='listitem' or @role='row']//span[@title]"
+        if not self.esperar_alguno([fila], timeout=15):
+            print("  ⚠️ La lista de miembros no cargó")
+            self._cerrar_dialogo_eliminar(False)
+            return None
+
+        titulos = []
+        vistos = set()
+        fin = False
+        try:
+            # La lista es virtual: hay que desplazarla y juntar lo que aparece en cada página
+            for _ in range(1000):
+                lectura = self.driver.execute_script(JS_LEER_MIEMBROS, self.XPATH_DIALOGO)
+                for titulo in lectura['titulos']:
+                    if titulo not in vistos:
+                        vistos.add(titulo)
+                        titulos.append(titulo)
+                if lectura['fin']:
+                    fin = True
+                    break
+                time.sleep(0.3)
+        except Exception as e:
+            print(f"  ⚠️ No se pudo leer la lista de miembros: {e}")
+            self._cerrar_dialogo_eliminar(False)
+            return None
+
+        self._cerrar_dialogo_eliminar(False)
+
+        # La cuenta propia aparece como 'Tú': si no está, la lectura quedó a medias
+        if not titulos or not vistos & {'Tú', 'You'}:
+            print("  ⚠️ La lista de miembros se leyó incompleta; no se guarda")
+            return None
+
+        # El final de la lista no se ve desde arriba: la cantidad leída debe
+        # coincidir con la del botón "N miembros de la comunidad"
+        entera = fin and self.total_miembros == len(titulos)
+        if not fin:
+            print("  ⚠️ La lectura se cortó antes del final: la lista no cuenta como completa")
+        elif not entera:
+            print(f"  ⚠️ Se leyeron {len(titulos)} de {self.total_miembros or '?'} miembros: "
+                  "la lista no cuenta como completa")
+
+        # El resto aparece con número o con nombre de contacto
+        titulos = pd.Series(titulos, dtype=object)
+        titulos = titulos[~titulos.isin(['Tú', 'You'])]
+        es_numero = titulos.str.fullmatch(r'\+?[\d\s\-().]{8,}').fillna(False).astype(bool)
+        miembros = set(normalizar_celulares(titulos[es_numero], self.prefijo_pais, self.longitud_celular).dropna())
+        completa = entera and bool(es_numero.all())
+
+        self.indice_miembros.guardar_instantanea(comunidad, miembros, completa)
+        print(f"  ✓ {len(titulos)} miembros leídos ({len(miembros)} con número visible)")
+        return miembros, completa
+
+    @staticmethod
+    def operacion_innecesaria(operacion, instantanea):
+        """True si la instantánea muestra que la operación no cambiaría nada"""
+        miembros, completa = instantanea
+        if operacion.tipo == 'agregar':
+            return operacion.celular in miembros
+        # Solo con la lista completa se puede asegurar que el número ya no está
+        return completa and operacion.celular not in miembros
+
+    def _eliminar_en_panel(self, celular):
+        """PASOS 3-6: eliminar un número desde el panel 'Buscar miembros' ya abierto"""
+        # PASO 3: Escribir el celular en el campo "Buscar miembros"
+        # Selector: div[@aria-label="Buscar miembros"][@contenteditable="true"]
+        try:
+            with self.metricas.medir('eliminar.paso3_escribir_numero'):
                 print("  PASO 3: Escribiendo número en campo 'Buscar miembros'...")
 
-                # Esperar con timeout extendido
-                wait_largo = WebDriverWait(self.driver, 60)
-
-                # Buscar el campo por aria-label="Buscar miembros"
-                campo_busqueda = None
-
-                # Método 1: Por aria-label exacto
-                try:
-                    campo_busqueda = wait_largo.until(EC.presence_of_element_located(
-                        (By.XPATH, "//div[@aria-label='Buscar miembros' and @contenteditable='true']")
-                    ))
-                    print("  ✓ Campo 'Buscar miembros' encontrado (método 1)")
-                except:
-                    pass
-
-                # Método 2: Buscar el <p> hijo dentro del div con aria-label
-                if not campo_busqueda:
-                    try:
-                        campo_busqueda = wait_largo.until(EC.presence_of_element_located(
-                            (By.XPATH, "//div[@aria-label='Buscar miembros']//p[contains(@class, 'selectable-text')]")
-                        ))
-                        print("  ✓ Campo encontrado (método 2: p dentro del div)")
-                    except:
-                        pass
-
-                if campo_busqueda:
-                    campo_busqueda.click()
-                    time.sleep(0.5)
+                # Campo por aria-label="Buscar miembros" o el <p> editable dentro de él
+                campo_busqueda = self.buscar_selector('campo_buscar_miembros', clickable=False)
+                campo_busqueda.click()
 
-                    # Limpiar campo
-                    campo_busqueda.send_keys(Keys.CONTROL + "a")
-                    campo_busqueda.send_keys(Keys.DELETE)
-                    time.sleep(0.5)
+                # Escribir el número en formato E.164 (reemplaza lo que hubiera en el campo)
+                celular_completo = celular
+                self.escribir_texto(campo_busqueda, celular_completo)
+                print(f"  ✓ Escrito: {celular_completo}")
 
-                    # Escribir el número con prefijo +57
-                    celular_completo = f"+57{celular}"
-                    campo_busqueda.send_keys(celular_completo)
-                    print(f"  ✓ Escrito: {celular_completo}")
-                    self.esperar_aleatorio(2, 3)
-                else:
-                    print("  ⚠️ No se encontró el campo 'Buscar miembros'")
+                # Esperar a que la lista se filtre por el número (o quede una sola fila)
+                filtrada = self.esperar_alguno([
+                    f"{self.XPATH_DIALOGO}//span[@title][contains(translate(@title, ' +-()', ''), '{celular.lstrip('+')}')]",
+                    self.XPATH_FILA_UNICA_MIEMBRO,
+                    self.XPATH_SIN_RESULTADOS,
+                ], timeout=10)
+                if not filtrada:
+                    print("  ⚠️ La lista de miembros no se filtró por el número")
                     return False
+                self.pausa_humana()
 
-            except Exception as e:
-                print(f"  ⚠️ Error en PASO 3 (escribir en buscar miembros): {e}")
-                return False
+        except Exception as e:
+            print(f"  ⚠️ Error en PASO 3 (escribir en buscar miembros): {e}")
+            return False
 
-            # PASO 4: Hacer clic en el resultado (el contacto encontrado)
-            try:
+        # PASO 4: Hacer clic en el resultado (el contacto encontrado)
+        try:
+            with self.metricas.medir('eliminar.paso4_clic_contacto'):
                 print("  PASO 4: Haciendo clic en el contacto encontrado...")
 
-                # Esperar con timeout extendido
-                wait_largo = WebDriverWait(self.driver, 60)
-                contacto = wait_largo.until(EC.element_to_be_clickable(
-                    (By.XPATH, "//div[contains(@class, '_ak8l') and contains(@class, '_ap1_')]")
-                ))
+                # La fila con el número en el título (o fallar apenas aparezca un error conocido)
+                try:
+                    contacto = self.buscar_selector('contacto_miembro', timeout=10, numero=celular.lstrip('+'))
+                except TimeoutException:
+                    # Contacto guardado con nombre: solo vale si el filtro dejó una única fila
+                    filas = self.escanear_elementos(self.XPATH_FILA_UNICA_MIEMBRO, limite=1)
+                    if not filas:
+                        raise
+                    print("  ✓ 'contacto_miembro' encontrado (estrategia: fila única)")
+                    contacto = filas[0]['elemento']
                 contacto.click()
                 print("  ✓ Clic en contacto exitoso")
-                self.esperar_aleatorio(2, 3)
-            except Exception as e:
-                print(f"  ⚠️ Error en PASO 4 (clic en contacto): {e}")
-                return False
+                self.pausa_humana()
+        except Exception as e:
+            print(f"  ⚠️ Error en PASO 4 (clic en contacto): {e}")
+            return False
 
-            # PASO 5: Clic en "Eliminar de la comunidad"
-            # Selector: div que contiene el SVG close-circle-refreshed y el span con texto "Eliminar de la comunidad"
-            try:
+        # PASO 5: Clic en "Eliminar de la comunidad"
+        # Selector: div que contiene el SVG close-circle-refreshed y el span con texto "Eliminar de la comunidad"
+        try:
+            with self.metricas.medir('eliminar.paso5_opcion_eliminar'):
                 print("  PASO 5: Buscando opción 'Eliminar de la comunidad'...")
 
-                # Esperar con timeout extendido
-                wait_largo = WebDriverWait(self.driver, 60)
+                # Span con el texto, div con el icono close-circle-refreshed o solo el texto
+                opcion_eliminar = self.buscar_selector('opcion_eliminar')
+                opcion_eliminar.click()
+                print("  ✓ Clic en 'Eliminar de la comunidad' exitoso")
+                self.pausa_humana()
 
-                # Método 1: Por el span con el texto y clases específicas
-                opcion_eliminar = None
-                try:
-                    opcion_eliminar = wait_largo.until(EC.element_to_be_clickable(
-                        (By.XPATH, "//span[contains(@class, 'x1o2sk6j') and contains(text(), 'Eliminar de la comunidad')]")
-                    ))
-                    print("  ✓ Opción eliminar encontrada (método 1: span texto)")
-                except:
-                    pass
-
-                # Método 2: Por el div padre que contiene el icono close-circle-refreshed
-                if not opcion_eliminar:
-                    try:
-                        # Buscar el div que contiene el SVG con title="close-circle-refreshed"
-                        div_eliminar = wait_largo.until(EC.presence_of_element_located(
-                            (By.XPATH, "//svg[@data-icon='close-circle-refreshed']/ancestor::div[contains(@class, 'x1c4vz4f')][1]")
-                        ))
-                        opcion_eliminar = div_eliminar
-                        print("  ✓ Opción eliminar encontrada (método 2: div con icono)")
-                    except:
-                        pass
-
-                if opcion_eliminar:
-                    opcion_eliminar.click()
-                    print("  ✓ Clic en 'Eliminar de la comunidad' exitoso")
-                    self.esperar_aleatorio(2, 3)
-                else:
-                    print("  ⚠️ No se encontró la opción 'Eliminar de la comunidad'")
-                    return False
-
-            except Exception as e:
-                print(f"  ⚠️ Error en PASO 5 (opción eliminar): {e}")
-                return False
+        except Exception as e:
+            print(f"  ⚠️ Error en PASO 5 (opción eliminar): {e}")
+            return False
 
-            # PASO 6: Confirmar eliminación haciendo clic en el botón "Eliminar"
-            # Selector: span con texto "Eliminar" y clases específicas
-            try:
+        # PASO 6: Confirmar eliminación haciendo clic en el botón "Eliminar"
+        # Selector: span con texto "Eliminar" y clases específicas
+        try:
+            with self.metricas.medir('eliminar.paso6_confirmar'):
                 print("  PASO 6: Confirmando eliminación con botón 'Eliminar'...")
 
-                # Esperar con timeout extendido
-                wait_largo = WebDriverWait(self.driver, 60)
-                boton_confirmar = wait_largo.until(EC.element_to_be_clickable(
-                    (By.XPATH, "//span[contains(@class, 'x140p0ai') and text()='Eliminar']")
-                ))
+                # Esperar con timeout extendido (o fallar apenas aparezca un error conocido)
+                xpath_confirmar = self.xpath_selector('confirmar_eliminar')
+                boton_confirmar = self.buscar_selector('confirmar_eliminar')
 
                 # Intentar clic normal, si falla usar JavaScript
                 try:
@@ -875,115 +3099,583 @@ class GestorComunidadesWhatsApp:
                     self.driver.execute_script("arguments[0].click();", boton_confirmar)
 
                 print("  ✓ Clic en botón 'Eliminar' confirmado")
-                print(f"✅ Participante {celular} eliminado exitosamente")
-                self.esperar_aleatorio(2, 3)
 
-                # Cerrar ventanas modales
-                self._cerrar_ventanas_modales()
+                # Resultado: se cierra la confirmación o aparece un error conocido
+                error = self._esperar_resultado_confirmacion(xpath_confirmar)
+                self.pausa_humana()
+                if error:
+                    print(f"  ⚠️ WhatsApp rechazó la eliminación ({error.motivo}): {error.texto}")
+                    return False
 
+                print(f"✅ Participante {celular} eliminado exitosamente")
                 return True
 
-            except Exception as e:
-                print(f"  ⚠️ Error en PASO 6 (confirmar eliminar): {e}")
-                self._cerrar_ventanas_modales()
+        except Exception as e:
+            print(f"  ⚠️ Error en PASO 6 (confirmar eliminar): {e}")
+            return False
+
+    def eliminar_participante(self, celular, cerrar_ventanas=True):
+        """Eliminar un participante de la comunidad - PASOS EXACTOS ACTUALIZADOS
+
+        Con cerrar_ventanas=False solo se cierra el diálogo actual y el chat de
+        la comunidad queda abierto para la siguiente operación del plan.
+        """
+        try:
+            # Convertir celular a E.164 (limpia el .0 si viene de Excel)
+            numero = self.normalizar_celular(celular)
+            if not numero:
+                print(f"⚠️ Número inválido: {celular}")
                 return False
+            celular = numero
+            print(f"\n➖ Eliminando: {celular}")
+
+            if not self._abrir_panel_miembros():
+                return False
+
+            exito = self._eliminar_en_panel(celular)
+
+            # Cerrar ventanas modales
+            self._cerrar_dialogo_eliminar(cerrar_ventanas)
+            return exito
 
         except Exception as e:
             print(f"❌ Error general eliminando {celular}: {e}")
             return False
 
-    def procesar_excel(self):
-        """Procesar archivo Excel con las listas"""
-        try:
-            # Buscar archivo Excel
-            archivos_excel = [f for f in os.listdir('.') if f.endswith('.xlsx') and 'comunidades' in f.lower()]
+    def eliminar_participantes(self, celulares):
+        """Eliminar varios participantes sin salir del panel 'Buscar miembros'
+
+        El tab 'Comunidad' y la lista de miembros se abren una sola vez; para
+        cada número se limpia la búsqueda, se elimina y se vuelve al mismo
+        panel. Si el panel se cierra se reabre. Devuelve {celular: True/False}.
+        """
+        resultados = {}
+        panel_abierto = False
+
+        for n, celular in enumerate(celulares, 1):
+            numero = self.normalizar_celular(celular)
+            if not numero:
+                print(f"  ⚠️ Número inválido: {celular}")
+                resultados[celular] = False
+                continue
+
+            print(f"\n➖ Eliminando {n}/{len(celulares)}: {numero}")
+
+            # Cada eliminación es una acción: esperar la cuota y el turno que marca el ritmo
+            self.esperar_cupo('eliminar')
+            self.esperar_turno()
+            inicio_accion = time.perf_counter()
+            limites_antes = self.motivos_error.get('limite_frecuencia', 0)
+            try:
+                if panel_abierto and not self._panel_miembros_abierto():
+                    print("  ℹ️ El panel de miembros se cerró, abriéndolo de nuevo...")
+                    self.metricas.reintento('eliminar.panel_miembros')
+                    panel_abierto = False
+                    if not self._volver_a_detalles_comunidad(self.comunidad_actual):
+                        for pendiente in celulares[n - 1:]:
+                            resultados[pendiente] = False
+                        break
+
+                if not panel_abierto:
+                    panel_abierto = self._abrir_panel_miembros()
+                    if not panel_abierto:
+                        for pendiente in celulares[n - 1:]:
+                            resultados[pendiente] = False
+                        break
+
+                resultados[celular] = self._eliminar_en_panel(numero)
+                self.anotar_cuota('eliminar', 1)
+                self.anotar_ritmo(resultados[celular], inicio_accion, limites_antes, 'eliminar')
+
+                # Si falló puede haber quedado abierto un menú o diálogo de confirmación
+                if not resultados[celular]:
+                    self._cerrar_dialogo_eliminar(False)
 
-            if not archivos_excel:
-                print("❌ No se encontró archivo Excel")
-                print("💡 Debe existir un archivo que contenga 'comunidades' en el nombre")
-                return False
+            except Exception as e:
+                print(f"❌ Error general eliminando {numero}: {e}")
+                resultados[celular] = False
+                self._cerrar_dialogo_eliminar(False)
+                self.anotar_ritmo(False, inicio_accion, limites_antes, 'eliminar')
+
+        # Cerrar el panel de miembros
+        self._cerrar_dialogo_eliminar(False)
+        return resultados
+
+    def normalizar_celular(self, celular):
+        """Número en formato E.164 o None si no es válido"""
+        e164 = normalizar_celulares(pd.Series([celular], dtype=object),
+                                    self.prefijo_pais, self.longitud_celular).iloc[0]
+        return None if pd.isna(e164) else e164
+
+    def depurar_operaciones(self, operaciones, vistas, reporte=None):
+        """Normalizar los números de un bloque y descartar inválidos y duplicados
+
+        Los números se convierten a E.164 de una sola vez sobre todo el bloque.
+        vistas guarda el último tipo aceptado de cada (comunidad, número); una
+        operación que repite ese mismo tipo es un duplicado. Las
+        rechazadas se escriben en reporte (un csv.writer) con su motivo.
+        Devuelve (operaciones válidas, cantidad de rechazadas).
+        """
+        celulares = normalizar_celulares(pd.Series([op.celular for op in operaciones], dtype=object),
+                                         self.prefijo_pais, self.longitud_celular)
+
+        validas = []
+        rechazadas = 0
+        for operacion, e164 in zip(operaciones, celulares):
+            if pd.isna(e164):
+                motivo = 'longitud_invalida'
+            elif vistas.get((operacion.comunidad, e164)) == operacion.tipo:
+                motivo = 'duplicado'
+            else:
+                vistas[(operacion.comunidad, e164)] = operacion.tipo
+                operacion.celular = e164
+                validas.append(operacion)
+                continue
 
-            archivo = archivos_excel[0]
-            print(f"\n📖 Procesando: {archivo}")
+            rechazadas += 1
+            if reporte:
+                reporte.writerow([operacion.fila, operacion.tipo, operacion.comunidad, operacion.celular, motivo])
+
+        return validas, rechazadas
+
+    def verificar_numero(self, celular):
+        """Abrir el chat del número: True si está en WhatsApp, False si no, None si no se pudo saber"""
+        try:
+            with self.metricas.medir('verificar_numero'):
+                self.driver.get(f"{self.url_whatsapp}/send?phone={celular.lstrip('+')}")
+                resultado = self.esperar_condicion(
+                    lambda d: self._error_visible() or bool(self.escanear_elementos(self.XPATH_CHAT_ABIERTO, limite=1)),
+                    timeout=45
+                )
+        except TimeoutException:
+            return None
+        except Exception as e:
+            print(f"  ⚠️ Error verificando {celular}: {e}")
+            return None
 
-            # Cargar Excel
-            df = pd.read_excel(archivo)
+        if isinstance(resultado, ErrorWhatsApp):
+            # Cerrar el aviso para no tapar la siguiente verificación
+            try:
+                ActionChains(self.driver).send_keys(Keys.ESCAPE).perform()
+            except:
+                pass
+            return False if resultado.motivo == 'no_esta_en_whatsapp' else None
+        return True
+
+    def descartar_sin_whatsapp(self, operaciones, reporte=None):
+        """Quitar las operaciones de números que no están en WhatsApp
+
+        Los números conocidos salen de la caché. Con verificar_numeros=True,
+        los números sin resultado vigente se verifican en el navegador antes
+        de empezar con las comunidades. Devuelve (operaciones válidas,
+        cantidad de rechazadas).
+        """
+        celulares = {operacion.celular for operacion in operaciones}
+        conocidos = self.cache_numeros.consultar(celulares, self.vigencia_numero_valido,
+                                                 self.vigencia_numero_invalido)
+
+        pendientes = sorted(celulares - set(conocidos))
+        if self.verificar_numeros and pendientes:
+            # Con varias cuentas los perfiles los tienen abiertos los procesos trabajadores
+            if len(self.sesiones_cuentas) > 1:
+                conocidos.update(self.coordinador_cuentas().verificar(pendientes))
+            elif self.abrir_navegador():
+                conocidos.update(self.verificar_pendientes(pendientes))
+
+        validas = []
+        rechazadas = 0
+        for operacion in operaciones:
+            if conocidos.get(operacion.celular) is False:
+                rechazadas += 1
+                if reporte:
+                    reporte.writerow([operacion.fila, operacion.tipo, operacion.comunidad,
+                                      operacion.celular, 'no_esta_en_whatsapp'])
+            else:
+                validas.append(operacion)
+        return validas, rechazadas
+
+    def verificar_pendientes(self, celulares):
+        """Verificar números en el navegador abierto y guardarlos en la caché
+
+        Devuelve {celular: está en WhatsApp} de los que se pudieron verificar.
+        """
+        print(f"\n🔎 Verificando {len(celulares)} números en WhatsApp...")
+        verificados = {}
+        for n, celular in enumerate(celulares, 1):
+            en_whatsapp = self.verificar_numero(celular)
+            if en_whatsapp is None:
+                print(f"  ⚠️ {n}/{len(celulares)} {celular}: no se pudo verificar")
+                continue
+            self.cache_numeros.guardar(celular, en_whatsapp)
+            verificados[celular] = en_whatsapp
+            print(f"  {'✓' if en_whatsapp else '✗'} {n}/{len(celulares)} {celular}")
+        return verificados
+
+    def coordinador_cuentas(self):
+        """Coordinador de las cuentas en paralelo; sus procesos se inician la primera vez"""
+        if self.coordinador is None:
+            self.coordinador = CoordinadorCuentas(self, self.sesiones_cuentas)
+            self.coordinador.iniciar()
+        return self.coordinador
+
+    def abrir_navegador(self):
+        """Configurar el navegador e iniciar WhatsApp si todavía no está abierto"""
+        if self.driver:
+            return True
+        return self.configurar_navegador() and self.iniciar_whatsapp()
 
-            # Verificar columnas
-            columnas_requeridas = ['Comunidad_Agregar', 'Celular_Agregar', 'Comunidad_Eliminar', 'Celular_Eliminar']
+    def sesion_activa(self):
+        """True si el navegador sigue abierto; si se cerró se descarta para reabrirlo"""
+        if not self.driver:
+            return False
+        try:
+            self.driver.current_url
+            return True
+        except Exception:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
+            return False
 
-            print(f"\n📋 Columnas encontradas: {list(df.columns)}")
+    def planificar_operaciones(self, operaciones):
+        """Agrupar las operaciones pendientes por comunidad
+
+        Antes de agrupar, las operaciones de un mismo número en una misma
+        comunidad se reducen a la última (agregar y luego eliminar deja solo
+        eliminar) y se omiten las que el índice de miembros muestra como ya
+        aplicadas. Devuelve un diccionario {comunidad: [operaciones]} en el
+        orden en que aparece cada comunidad en el Excel; las operaciones de
+        una comunidad conservan el orden de las filas.
+        """
+        # Reducir cada (comunidad, número) a su estado final: la última
+        # operación gana y las anteriores se cancelan
+        finales = {}
+        total = 0
+        for operacion in operaciones:
+            total += 1
+            clave = (operacion.comunidad, operacion.celular)
+            finales.pop(clave, None)
+            finales[clave] = operacion
+
+        canceladas = total - len(finales)
+        self.operaciones_canceladas += canceladas
+        if canceladas:
+            print(f"\n🔁 {canceladas} operaciones canceladas por otra posterior del mismo número en la misma comunidad")
+
+        # Comparar con el índice de miembros: agregar a quien ya es miembro o
+        # eliminar a quien ya salió no cambia nada
+        if self.usar_instantanea:
+            instantaneas = {}
+            omitidas = 0
+            for clave, operacion in list(finales.items()):
+                if operacion.comunidad not in instantaneas:
+                    instantaneas[operacion.comunidad] = self.indice_miembros.instantanea(
+                        operacion.comunidad, self.vigencia_instantanea
+                    )
+                instantanea = instantaneas[operacion.comunidad]
+                if instantanea and self.operacion_innecesaria(operacion, instantanea):
+                    del finales[clave]
+                    omitidas += 1
+                    if self.diario:
+                        self.diario.registrar(operacion, True)
+            self.operaciones_omitidas += omitidas
+            if omitidas:
+                print(f"\n📇 {omitidas} operaciones omitidas: el índice de miembros muestra que ya están aplicadas")
+
+        plan = {}
+        for operacion in finales.values():
+            plan.setdefault(operacion.comunidad, []).append(operacion)
+
+        # Al reanudar, quitar las operaciones que el diario marca como completadas
+        if self.diario and self.diario.completadas:
+            saltadas = 0
+            for comunidad in list(plan):
+                pendientes = [op for op in plan[comunidad] if not self.diario.completada(op)]
+                saltadas += len(plan[comunidad]) - len(pendientes)
+                if pendientes:
+                    plan[comunidad] = pendientes
+                else:
+                    del plan[comunidad]
+            print(f"\n⏭️ Reanudando: {saltadas} operaciones ya completadas se saltan")
 
-            # Limpiar datos
-            df = df.fillna('')
+        total_operaciones = sum(len(ops) for ops in plan.values())
+        print(f"\n🗂️ Plan: {total_operaciones} operaciones en {len(plan)} comunidades")
+        for comunidad, operaciones in plan.items():
+            agregar = sum(1 for op in operaciones if op.tipo == 'agregar')
+            print(f"   • {comunidad}: {agregar} agregar, {len(operaciones) - agregar} eliminar")
 
-            # Usar la cantidad configurada al inicio
-            print(f"\n🔢 Total de registros en Excel: {len(df)}")
+        return plan
 
-            if self.cantidad_procesar is None:
-                # Procesar todos
-                df_procesar = df
-                print(f"🚀 Procesando TODOS los {len(df_procesar)} registros...")
+    @medido('volver_detalles')
+    def _volver_a_detalles_comunidad(self, nombre_comunidad):
+        """Volver al panel de detalles de la comunidad abierta sin buscarla de nuevo"""
+        try:
+            # Si el chat se cerró, hay que buscar la comunidad otra vez
+            if not self.driver.find_elements(By.XPATH, "//div[@title='Detalles del perfil'][@role='button']"):
+                print("  ℹ️ El chat de la comunidad se cerró, buscándola de nuevo...")
+                self.metricas.reintento('volver_detalles')
+                return self.buscar_comunidad(nombre_comunidad)
+
+            boton_detalles = self.wait.until(EC.element_to_be_clickable(
+                (By.XPATH, "//div[@title='Detalles del perfil'][@role='button']")
+            ))
+            boton_detalles.click()
+            self.esperar_elemento(self.XPATH_PANEL_INFO, timeout=30)
+            print("  ✓ Panel de detalles de la comunidad abierto de nuevo")
+            self.pausa_humana()
+            return True
+
+        except Exception as e:
+            print(f"  ⚠️ No se pudo volver a los detalles ({e}), buscando la comunidad de nuevo...")
+            self.metricas.reintento('volver_detalles')
+            self._cerrar_ventanas_modales()
+            return self.buscar_comunidad(nombre_comunidad)
+
+    def _agrupar_en_bloques(self, operaciones):
+        """Agrupar operaciones consecutivas de una comunidad en bloques
+
+        Las operaciones 'agregar' seguidas se juntan en lotes de hasta
+        max_por_lote números para un solo diálogo 'Añadir miembros'; las
+        'eliminar' seguidas comparten una sesión del panel 'Buscar miembros'.
+        El orden del Excel se conserva.
+        """
+        bloques = []
+        for operacion in operaciones:
+            ultimo = bloques[-1] if bloques else None
+            if ultimo and ultimo[0].tipo == operacion.tipo and (
+                    operacion.tipo == 'eliminar' or len(ultimo) < self.max_por_lote):
+                ultimo.append(operacion)
             else:
-                # Procesar cantidad específica
-                df_procesar = df.head(self.cantidad_procesar)
-                print(f"🚀 Procesando {len(df_procesar)} registros (de {len(df)} totales)...")
-
-            # Estadísticas
-            agregados_ok = 0
-            agregados_error = 0
-            eliminados_ok = 0
-            eliminados_error = 0
-
-            # Procesar cada fila
-            for i, row in df_procesar.iterrows():
-                print(f"\n{'='*60}")
-                print(f"📊 Procesando registro {i+1}/{len(df_procesar)}")
-                print(f"{'='*60}")
-
-                # PROCESO 1: AGREGAR
-                if row['Comunidad_Agregar'] and row['Celular_Agregar']:
-                    comunidad_agregar = str(row['Comunidad_Agregar']).strip()
-                    celular_agregar = str(row['Celular_Agregar']).strip()
-
-                    print(f"\n➕ PROCESO: AGREGAR")
-                    print(f"   Comunidad: {comunidad_agregar}")
-                    print(f"   Celular: {celular_agregar}")
-
-                    if self.buscar_comunidad(comunidad_agregar):
-                        if self.agregar_participante(celular_agregar):
-                            agregados_ok += 1
+                bloques.append([operacion])
+        return bloques
+
+    @staticmethod
+    def estadisticas_vacias():
+        return {
+            'agregados_ok': 0,
+            'agregados_error': 0,
+            'eliminados_ok': 0,
+            'eliminados_error': 0,
+            'omitidas': 0,
+        }
+
+    @staticmethod
+    def clave_estadistica(operacion, exito):
+        prefijo = 'agregados' if operacion.tipo == 'agregar' else 'eliminados'
+        return f"{prefijo}_{'ok' if exito else 'error'}"
+
+    def parametros_cuenta(self, session_path):
+        """Parámetros para que un proceso trabajador configure su propio gestor"""
+        return {
+            'session_path': session_path,
+            'url_whatsapp': self.url_whatsapp,
+            'headless': self.headless,
+            'modo_liviano': self.modo_liviano,
+            'tiempo_min_contacto': self.tiempo_min_contacto,
+            'tiempo_max_contacto': self.tiempo_max_contacto,
+            'pausa_min_paso': self.pausa_min_paso,
+            'pausa_max_paso': self.pausa_max_paso,
+            'max_por_lote': self.max_por_lote,
+            'prefijo_pais': self.prefijo_pais,
+            'longitud_celular': self.longitud_celular,
+            'usar_instantanea': self.usar_instantanea,
+            'vigencia_instantanea': self.vigencia_instantanea,
+            'min_operaciones_instantanea': self.min_operaciones_instantanea,
+            'usar_cuotas': self.usar_cuotas,
+            'ruta_cuotas': self.ruta_cuotas,
+        }
+
+    def ejecutar_plan(self, plan):
+        """Ejecutar el plan abriendo cada comunidad una sola vez"""
+        estadisticas = self.estadisticas_vacias()
+
+        def registrar(operacion, exito):
+            estadisticas[self.clave_estadistica(operacion, exito)] += 1
+            if self.diario:
+                self.diario.registrar(operacion, exito)
+            if exito:
+                self.indice_miembros.marcar(operacion.comunidad, operacion.celular, operacion.tipo == 'agregar')
+
+        def omitir(operacion):
+            estadisticas['omitidas'] += 1
+            if self.diario:
+                self.diario.registrar(operacion, True)
+
+        # En un proceso trabajador el índice de nombres todavía no tiene las comunidades del plan
+        self.indice_comunidades.registrar(plan)
+
+        # Las cuotas de la cuenta se abren con el primer plan (el proceso
+        # trabajador ya tiene su session_path), solo si hay archivo de cuotas
+        if self.usar_cuotas and self.cuotas is None and os.path.exists(self.ruta_cuotas):
+            self.cuotas = CuotasOperaciones(os.path.join(os.getcwd(), "cuotas_uso.sqlite"), self.ruta_cuotas,
+                                            os.path.basename(self.session_path))
+        if self.cuotas:
+            conteos = {}
+            for operaciones in plan.values():
+                for operacion in operaciones:
+                    conteos[operacion.tipo] = conteos.get(operacion.tipo, 0) + 1
+            self.cuotas.estimar(conteos)
+
+        comunidades = list(plan.items())
+        for n, (comunidad, operaciones) in enumerate(comunidades, 1):
+            print(f"\n{'='*60}")
+            print(f"🏘️ Comunidad {n}/{len(comunidades)}: {comunidad} ({len(operaciones)} operaciones)")
+            print(f"{'='*60}")
+
+            # Abrir una comunidad también cuenta como acción para el ritmo
+            self.esperar_turno()
+            inicio_accion = time.perf_counter()
+            limites_antes = self.motivos_error.get('limite_frecuencia', 0)
+            encontrada = self.buscar_comunidad(comunidad)
+            self.anotar_ritmo(encontrada, inicio_accion, limites_antes, 'abrir')
+            if not encontrada:
+                print(f"❌ Se omiten {len(operaciones)} operaciones de '{comunidad}'")
+                for operacion in operaciones:
+                    registrar(operacion, False)
+                self._cerrar_ventanas_modales()
+                continue
+
+            # Sin una instantánea vigente, leer la lista de miembros una vez y
+            # saltar las operaciones que no cambiarían nada
+            leer_lista = self.usar_instantanea and len(operaciones) >= self.min_operaciones_instantanea
+            if leer_lista and self.indice_miembros.instantanea(comunidad, self.vigencia_instantanea) is None:
+                instantanea = self.leer_miembros_comunidad(comunidad)
+                if instantanea:
+                    pendientes = []
+                    for operacion in operaciones:
+                        if self.operacion_innecesaria(operacion, instantanea):
+                            omitir(operacion)
                         else:
-                            agregados_error += 1
+                            pendientes.append(operacion)
+                    if len(pendientes) < len(operaciones):
+                        print(f"  📇 {len(operaciones) - len(pendientes)} operaciones ya estaban aplicadas")
+                    operaciones = pendientes
+
+                if not operaciones:
+                    self._cerrar_ventanas_modales()
+                    continue
+                if not self._volver_a_detalles_comunidad(comunidad):
+                    print(f"❌ Se perdió la comunidad '{comunidad}', se omiten {len(operaciones)} operaciones")
+                    for operacion in operaciones:
+                        registrar(operacion, False)
+                    self._cerrar_ventanas_modales()
+                    continue
+
+            fallidas = []
+            bloques = self._agrupar_en_bloques(operaciones)
+            for j, bloque in enumerate(bloques):
+                filas = ', '.join(str(op.fila) for op in bloque)
+                print(f"\n📊 Bloque {j+1}/{len(bloques)}: {len(bloque)} × {bloque[0].tipo} (filas {filas} del Excel)")
+
+                # La comunidad ya está abierta: solo volver al panel de detalles
+                if j > 0 and not self._volver_a_detalles_comunidad(comunidad):
+                    print(f"❌ Se perdió la comunidad '{comunidad}', se omiten las operaciones restantes")
+                    for pendiente in bloques[j:]:
+                        for operacion in pendiente:
+                            registrar(operacion, False)
+                    break
+
+                if bloque[0].tipo == 'agregar':
+                    resultados = self.agregar_participantes([op.celular for op in bloque])
+                else:
+                    resultados = self.eliminar_participantes([op.celular for op in bloque])
+                for operacion in bloque:
+                    if resultados.get(operacion.celular, False):
+                        registrar(operacion, True)
+                    else:
+                        fallidas.append(operacion)
+
+            # Confirmar los fallos con una sola lectura de la lista de miembros:
+            # a veces el cambio se aplicó aunque la confirmación no se vio
+            if fallidas and leer_lista and self._volver_a_detalles_comunidad(comunidad):
+                instantanea = self.leer_miembros_comunidad(comunidad)
+                if instantanea:
+                    confirmadas = [op for op in fallidas if self.operacion_innecesaria(op, instantanea)]
+                    if confirmadas:
+                        print(f"  📇 {len(confirmadas)} operaciones confirmadas con la lista de miembros")
+                    fallidas = [op for op in fallidas if op not in confirmadas]
+                    for operacion in confirmadas:
+                        registrar(operacion, True)
+            for operacion in fallidas:
+                registrar(operacion, False)
+
+            # Cerrar cualquier ventana abierta y volver a la vista principal
+            self._cerrar_ventanas_modales()
+            self.selectores.guardar()
+            self.ritmo.guardar()
+
+        return estadisticas
+
+    def mostrar_metricas(self):
+        """Mostrar p50/p95 por paso y exportar las métricas a JSON y Prometheus"""
+        resumen = self.metricas.resumen()
+        if not resumen:
+            return
+
+        print("\n⏱️ Tiempos por paso (segundos):")
+        print(f"   {'paso':<32} {'n':>5} {'p50':>7} {'p95':>7} {'fallos':>7} {'reint.':>7}")
+        for paso, datos in resumen.items():
+            print(f"   {paso:<32} {datos['cantidad']:>5} {datos['p50']:>7.2f} {datos['p95']:>7.2f} "
+                  f"{datos['fallos']:>7} {datos['reintentos']:>7}")
 
-                        # Cerrar cualquier ventana abierta y volver a la vista principal
-                        self._cerrar_ventanas_modales()
+        try:
+            self.metricas.exportar_json(self.ruta_metricas + ".json", self.motivos_error)
+            self.metricas.exportar_prometheus(self.ruta_metricas + ".prom", self.motivos_error)
+            print(f"📁 Métricas exportadas a {self.ruta_metricas}.json y {self.ruta_metricas}.prom")
+        except Exception as e:
+            print(f"⚠️ No se pudieron exportar las métricas: {e}")
 
-                    # Esperar entre procesos
-                    print(f"\n⏳ Esperando {self.tiempo_entre_procesos} segundos antes del siguiente proceso...")
-                    time.sleep(self.tiempo_entre_procesos)
+    def procesar_excel(self):
+        """Procesar archivo Excel con las listas"""
+        archivo_rechazos = None
+        try:
+            # Buscar archivo Excel (o CSV / Parquet)
+            if self.archivo_entrada:
+                archivo = self.archivo_entrada
+            else:
+                archivos_excel = sorted(
+                    (f for f in os.listdir('.')
+                     if f.lower().endswith(EXTENSIONES_ENTRADA) and 'comunidades' in f.lower()),
+                    key=lambda f: EXTENSIONES_ENTRADA.index(os.path.splitext(f)[1].lower())
+                )
 
-                # PROCESO 2: ELIMINAR
-                if row['Comunidad_Eliminar'] and row['Celular_Eliminar']:
-                    comunidad_eliminar = str(row['Comunidad_Eliminar']).strip()
-                    celular_eliminar = str(row['Celular_Eliminar']).strip()
+                if not archivos_excel:
+                    print("❌ No se encontró archivo Excel")
+                    print("💡 Debe existir un archivo que contenga 'comunidades' en el nombre")
+                    return False
 
-                    print(f"\n➖ PROCESO: ELIMINAR")
-                    print(f"   Comunidad: {comunidad_eliminar}")
-                    print(f"   Celular: {celular_eliminar}")
+                archivo = archivos_excel[0]
+            print(f"\n📖 Procesando: {archivo}")
 
-                    if self.buscar_comunidad(comunidad_eliminar):
-                        if self.eliminar_participante(celular_eliminar):
-                            eliminados_ok += 1
-                        else:
-                            eliminados_error += 1
+            # Diario de progreso para poder reanudar con --resume
+            ruta_diario = f"{os.path.splitext(archivo)[0]}.progreso.jsonl"
+            if not self.reanudar and os.path.exists(ruta_diario):
+                print(f"💡 Existe un diario de progreso ({ruta_diario}); usa --resume para continuar donde quedó")
+            self.diario = DiarioProgreso(ruta_diario, reanudar=self.reanudar)
+            print(f"📝 Diario de progreso: {ruta_diario}")
 
-                        # Cerrar cualquier ventana abierta y volver a la vista principal
-                        self._cerrar_ventanas_modales()
+            # Leer en streaming: se planifica y ejecuta por bloques, así la
+            # primera operación empieza sin esperar a leer todo el archivo
+            if self.cantidad_procesar is None:
+                print("🚀 Procesando TODOS los registros...")
+            else:
+                print(f"🚀 Procesando los primeros {self.cantidad_procesar} registros...")
+            operaciones = leer_operaciones(archivo, self.cantidad_procesar)
+
+            # Números rechazados antes de abrir el navegador
+            ruta_rechazos = f"{os.path.splitext(archivo)[0]}.rechazados.csv"
+            archivo_rechazos = open(ruta_rechazos, 'w', newline='', encoding='utf-8')
+            estadisticas = self.procesar_operaciones(operaciones, ruta_rechazos, archivo_rechazos)
+            if estadisticas is None:
+                return False
+            rechazadas = estadisticas['rechazadas']
 
-                # Esperar entre contactos (si no es el último)
-                if i < len(df_procesar) - 1:
-                    self.esperar_aleatorio(self.tiempo_min_contacto, self.tiempo_max_contacto)
+            agregados_ok = estadisticas['agregados_ok']
+            agregados_error = estadisticas['agregados_error']
+            eliminados_ok = estadisticas['eliminados_ok']
+            eliminados_error = estadisticas['eliminados_error']
 
             # Mostrar estadísticas finales
             print("\n" + "="*60)
@@ -993,46 +3685,285 @@ class GestorComunidadesWhatsApp:
             print(f"❌ Errores al agregar: {agregados_error}")
             print(f"➖ Eliminados exitosos: {eliminados_ok}")
             print(f"❌ Errores al eliminar: {eliminados_error}")
+            for motivo, cantidad in self.motivos_error.items():
+                print(f"   ⚠️ {motivo}: {cantidad}")
+            print(f"🚫 Rechazados sin abrir el navegador: {rechazadas}")
+            print(f"🔁 Canceladas por una operación posterior: {self.operaciones_canceladas}")
+            print(f"📇 Omitidas por el índice de miembros: {self.operaciones_omitidas + estadisticas['omitidas']}")
             print(f"📈 Total procesados: {agregados_ok + agregados_error + eliminados_ok + eliminados_error}")
+            self.mostrar_metricas()
             print("="*60)
 
+            self.estadisticas = estadisticas
+
             return True
 
         except Exception as e:
             print(f"❌ Error procesando Excel: {e}")
             return False
+        finally:
+            # Los procesos de las cuentas viven toda la corrida, no un bloque
+            if self.coordinador:
+                self.coordinador.cerrar()
+                self.coordinador = None
+            if self.diario:
+                self.diario.cerrar()
+            if archivo_rechazos:
+                archivo_rechazos.close()
+
+    def procesar_operaciones(self, operaciones, ruta_rechazos, archivo_rechazos):
+        """Depurar, planificar y ejecutar operaciones por bloques
+
+        Las operaciones rechazadas antes de abrir el navegador se escriben en
+        archivo_rechazos (CSV). Devuelve las estadísticas con la cantidad de
+        'rechazadas', o None si no se pudo abrir el navegador.
+        """
+        reporte = csv.writer(archivo_rechazos)
+        reporte.writerow(['fila', 'tipo', 'comunidad', 'celular', 'motivo'])
+        vistas = {}
+
+        estadisticas = self.estadisticas_vacias()
+        estadisticas['rechazadas'] = 0
+        for numero_bloque in itertools.count(1):
+            bloque = list(itertools.islice(operaciones, self.operaciones_por_bloque))
+            if not bloque:
+                break
+            if numero_bloque > 1 or len(bloque) == self.operaciones_por_bloque:
+                print(f"\n📦 Bloque de lectura {numero_bloque}: filas {bloque[0].fila}-{bloque[-1].fila}")
+
+            # Normalizar números y descartar inválidos y duplicados
+            bloque, rechazadas_bloque = self.depurar_operaciones(bloque, vistas, reporte)
+
+            # Descartar números que no están en WhatsApp (caché y verificación previa)
+            bloque, sin_whatsapp = self.descartar_sin_whatsapp(bloque, reporte)
+            rechazadas_bloque += sin_whatsapp
+            estadisticas['rechazadas'] += rechazadas_bloque
+            if rechazadas_bloque:
+                print(f"🚫 {rechazadas_bloque} operaciones rechazadas (ver {ruta_rechazos})")
+            if not bloque:
+                continue
+
+            # Claves de búsqueda de las comunidades nuevas (una vez por nombre)
+            for grupo in self.indice_comunidades.registrar(operacion.comunidad for operacion in bloque):
+                print(f"⚠️ Comunidades que solo se distinguen por el emoji: {', '.join(grupo)}")
+
+            # Agrupar operaciones por comunidad y ejecutarlas
+            plan = self.planificar_operaciones(bloque)
+            if len(self.sesiones_cuentas) > 1:
+                parciales = self.coordinador_cuentas().ejecutar(plan)
+            else:
+                # El navegador se abre recién cuando hay algo que ejecutar
+                if not self.abrir_navegador():
+                    return None
+                parciales = self.ejecutar_plan(plan)
+            for clave, valor in parciales.items():
+                estadisticas[clave] += valor
+
+        return estadisticas
 
     def ejecutar(self):
-        """Ejecutar proceso completo"""
+        """Ejecutar proceso completo y devolver el código de salida"""
+        codigo = SALIDA_OK
         try:
             print("\n" + "="*60)
             print("🤖 GESTOR DE COMUNIDADES DE WHATSAPP")
             print("="*60)
 
             # Configurar parámetros
-            self.configurar_parametros()
+            if not self.configurar_parametros():
+                return SALIDA_ERROR
 
-            # Configurar navegador
-            if not self.configurar_navegador():
-                return
+            # Procesar Excel (el navegador se abre con el primer bloque válido;
+            # con varias cuentas cada proceso trabajador abre el suyo)
+            if not self.procesar_excel():
+                return SALIDA_ERROR
 
-            # Iniciar WhatsApp
-            if not self.iniciar_whatsapp():
-                return
+            if self.estadisticas['agregados_error'] or self.estadisticas['eliminados_error']:
+                codigo = SALIDA_CON_FALLOS
+            print("\n🎉 ¡Proceso completado!")
 
-            # Procesar Excel
-            self.procesar_excel()
+        except KeyboardInterrupt:
+            print("\n⛔ Proceso interrumpido")
+            print("💡 El avance quedó en el diario de progreso: ejecuta de nuevo con --resume para continuar")
+            codigo = SALIDA_INTERRUMPIDA
+        except Exception as e:
+            print(f"❌ Error general: {e}")
+            codigo = SALIDA_ERROR
+        finally:
+            self.selectores.guardar()
+            self.ritmo.guardar()
+            self.indice_miembros.cerrar()
+            self.cache_numeros.cerrar()
+            self.indice_comunidades.cerrar()
+            if self.cuotas:
+                self.cuotas.cerrar()
+            if self.driver:
+                if self.interactivo:
+                    input("\n⏸️ Presiona Enter para cerrar el navegador...")
+                self.driver.quit()
+        return codigo
 
-            print("\n🎉 ¡Proceso completado!")
+    def ejecutar_servicio(self, puerto=8787):
+        """Modo servicio: abrir WhatsApp Web una vez y atender trabajos por HTTP"""
+        try:
+            print("\n" + "="*60)
+            print("🤖 GESTOR DE COMUNIDADES DE WHATSAPP (modo servicio)")
+            print("="*60)
+
+            # Sin preguntas: se usa la sesión guardada si existe
+            self.usar_cache = os.path.exists(self.session_path) and len(os.listdir(self.session_path)) > 0
+            if not self.abrir_navegador():
+                print("❌ No se pudo abrir WhatsApp Web")
+                return SALIDA_ERROR
+
+            ServicioTrabajos(self, puerto).atender()
+            return SALIDA_OK
 
+        except KeyboardInterrupt:
+            print("\n⛔ Servicio detenido")
+            return SALIDA_OK
         except Exception as e:
             print(f"❌ Error general: {e}")
+            return SALIDA_ERROR
         finally:
+            self.selectores.guardar()
+            self.ritmo.guardar()
+            self.indice_miembros.cerrar()
+            self.cache_numeros.cerrar()
+            self.indice_comunidades.cerrar()
+            if self.cuotas:
+                self.cuotas.cerrar()
             if self.driver:
-                input("\n⏸️ Presiona Enter para cerrar el navegador...")
                 self.driver.quit()
 
 
-if __name__ == "__main__":
+def crear_parser():
+    """Opciones de la línea de comandos (también son las claves del archivo de configuración)"""
+    parser = argparse.ArgumentParser(description="Gestor de comunidades de WhatsApp")
+    parser.add_argument("--config", metavar="ARCHIVO",
+                        help="Archivo de configuración .toml, .yaml o .json con cualquiera de estas opciones "
+                             "(las opciones de la línea de comandos tienen prioridad)")
+    parser.add_argument("--no-interactivo", action="store_true",
+                        help="No hacer preguntas ni esperar Enter al final (cron, supervisor)")
+    parser.add_argument("--headless", action="store_true",
+                        help="Chrome sin ventana (requiere una sesión ya guardada)")
+    parser.add_argument("--liviano", action="store_true",
+                        help="Sin imágenes, medios, GPU ni animaciones, ventana chica y headless si hay sesión guardada")
+    parser.add_argument("--archivo",
+                        help="Archivo de entrada .xlsx, .csv o .parquet (por defecto se busca uno con 'comunidades' en el nombre)")
+    parser.add_argument("--limite", type=int,
+                        help="Procesar solo las primeras N filas (por defecto todas)")
+    parser.add_argument("--sesion", metavar="DIR",
+                        help="Carpeta de la sesión de Chrome (por defecto whatsapp_session)")
+    parser.add_argument("--nueva-sesion", action="store_true",
+                        help="Escanear un QR nuevo aunque haya una sesión guardada")
+    parser.add_argument("--tiempo-min", type=float,
+                        help="Tiempo mínimo inicial entre contactos en segundos (por defecto 5)")
+    parser.add_argument("--tiempo-max", type=float,
+                        help="Tiempo máximo inicial entre contactos en segundos (por defecto 10)")
+    parser.add_argument("--pausa-min-paso", type=float,
+                        help="Pausa mínima después de cada clic en segundos (por defecto 0.3)")
+    parser.add_argument("--pausa-max-paso", type=float,
+                        help="Pausa máxima después de cada clic en segundos (por defecto 0.8)")
+    parser.add_argument("--max-por-lote", type=int,
+                        help="Números por diálogo 'Añadir miembros' (por defecto 5)")
+    parser.add_argument("--prefijo-pais", default="57",
+                        help="Prefijo de país para los números sin código internacional (por defecto 57)")
+    parser.add_argument("--longitud-celular", type=int,
+                        help="Dígitos de un celular nacional sin prefijo (por defecto 10)")
+    parser.add_argument("--verificar-numeros", action="store_true",
+                        help="Verificar en WhatsApp los números antes de trabajar en las comunidades")
+    parser.add_argument("--resume", action="store_true",
+                        help="Saltar las operaciones ya completadas según el diario de progreso")
+    parser.add_argument("--cuentas", type=int, default=1,
+                        help="Cantidad de cuentas administradoras en paralelo "
+                             "(sesiones whatsapp_session, whatsapp_session_2, ...)")
+    parser.add_argument("--sesiones", nargs="+", metavar="DIR",
+                        help="Carpetas de sesión de cada cuenta (en lugar de --cuentas)")
+    parser.add_argument("--cuotas", metavar="JSON",
+                        help="Cuotas por hora y por día de cada cuenta (por defecto cuotas.json; sin archivo no hay cuotas)")
+    parser.add_argument("--sin-cuotas", action="store_true",
+                        help="Ignorar el archivo de cuotas")
+    parser.add_argument("--instalar-dependencias", action="store_true",
+                        help="Verificar e instalar con pip las dependencias al arrancar")
+    parser.add_argument("--actualizar-driver", action="store_true",
+                        help="Resolver de nuevo el chromedriver aunque haya uno guardado")
+    parser.add_argument("--servicio", action="store_true",
+                        help="Mantener WhatsApp Web abierto y recibir trabajos por HTTP local")
+    parser.add_argument("--puerto", type=int, default=8787,
+                        help="Puerto de la API del modo servicio (por defecto 8787)")
+    return parser
+
+
+def _leer_argumentos(parser, argv):
+    """Opciones de la línea de comandos sobre los valores de --config; None si la configuración no sirve"""
+    # El archivo de configuración cambia los valores por defecto; las opciones explícitas ganan
+    previo, _ = parser.parse_known_args(argv)
+    if previo.config:
+        try:
+            configuracion = cargar_configuracion(previo.config)
+        except Exception as e:
+            print(f"❌ No se pudo leer la configuración {previo.config}: {e}")
+            return None
+        opciones = {accion.dest for accion in parser._actions}
+        desconocidas = sorted(set(configuracion) - opciones)
+        if desconocidas:
+            print(f"❌ Opciones desconocidas en {previo.config}: {', '.join(desconocidas)}")
+            return None
+        parser.set_defaults(**configuracion)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Punto de entrada: main(['--no-interactivo', '--archivo', 'lista.xlsx']) devuelve el código de salida"""
+    parser = crear_parser()
+    try:
+        args = _leer_argumentos(parser, argv)
+    except SystemExit as e:
+        # argparse sale con 2 ante opciones inválidas y con 0 tras --help
+        return SALIDA_OK if e.code in (0, None) else SALIDA_ERROR
+    if args is None:
+        return SALIDA_ERROR
+
     gestor = GestorComunidadesWhatsApp()
-    gestor.ejecutar()
+    gestor.interactivo = not args.no_interactivo
+    gestor.headless = args.headless
+    gestor.modo_liviano = args.liviano
+    gestor.actualizar_driver = args.actualizar_driver
+    gestor.nueva_sesion = args.nueva_sesion
+    gestor.reanudar = args.resume
+    gestor.archivo_entrada = args.archivo
+    gestor.cantidad_procesar = args.limite
+    gestor.prefijo_pais = str(args.prefijo_pais).lstrip('+')
+    gestor.verificar_numeros = args.verificar_numeros
+    gestor.usar_cuotas = not args.sin_cuotas
+    for opcion, atributo in (('tiempo_min', 'tiempo_min_contacto'), ('tiempo_max', 'tiempo_max_contacto'),
+                             ('pausa_min_paso', 'pausa_min_paso'), ('pausa_max_paso', 'pausa_max_paso'),
+                             ('max_por_lote', 'max_por_lote'), ('longitud_celular', 'longitud_celular')):
+        if getattr(args, opcion) is not None:
+            setattr(gestor, atributo, getattr(args, opcion))
+    if args.sesion:
+        gestor.session_path = os.path.abspath(args.sesion)
+        gestor.ritmo = gestor.crear_ritmo()
+    if args.cuotas:
+        gestor.ruta_cuotas = os.path.abspath(args.cuotas)
+        if not os.path.exists(gestor.ruta_cuotas):
+            print(f"❌ No existe el archivo de cuotas: {gestor.ruta_cuotas}")
+            return SALIDA_ERROR
+    if args.sesiones:
+        gestor.sesiones_cuentas = args.sesiones
+    elif args.cuentas > 1:
+        gestor.sesiones_cuentas = [gestor.session_path] + [
+            f"{gestor.session_path}_{n}" for n in range(2, args.cuentas + 1)
+        ]
+    if args.servicio:
+        # El servicio tiene abierto su propio navegador: un trabajador abriría el mismo perfil
+        if len(gestor.sesiones_cuentas) > 1:
+            print("❌ --servicio no se puede combinar con --cuentas ni --sesiones")
+            return SALIDA_ERROR
+        return gestor.ejecutar_servicio(args.puerto)
+    return gestor.ejecutar()
+
+
+if __name__ == "__main__":
+    sys.exit(main())